@@ -4,46 +4,217 @@ Handles status polling requests for blueprint processing status.
 """
 
 import json
+import base64
+import gzip
+import time
 import boto3
-from typing import Dict, Any, Optional
+from decimal import Decimal
+from typing import Dict, Any, Optional, Tuple, List
+from boto3.dynamodb.types import Binary, TypeDeserializer
 from botocore.exceptions import ClientError
 
+from api.middleware.serialization import JSON_CORS_HEADERS, dumps, loads
+
 # Initialize AWS clients
-dynamodb = boto3.resource('dynamodb')
+dynamodb_client = boto3.client('dynamodb')
 
 # Table name for status storage (will be created by CloudFormation)
 STATUS_TABLE_NAME = 'room-detection-status'
 
+# Only the attributes the handler actually returns are read from DynamoDB
+STATUS_PROJECTION = '#s, processing_time_ms, detected_rooms, #m, #e'
+STATUS_PROJECTION_NAMES = {'#s': 'status', '#m': 'message', '#e': 'error'}
+
+_deserializer = TypeDeserializer()
+
+# Terminal statuses never change, so warm containers can answer repeat polls
+# from memory. Entries are evicted FIFO once the cache is full.
+TERMINAL_STATUSES = ('completed', 'failed')
+STATUS_CACHE_TTL_SECONDS = 60
+STATUS_CACHE_MAX_ENTRIES = 1024
+_STATUS_CACHE: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+# BatchGetItem accepts at most 100 keys per call; unprocessed keys are
+# retried with exponential backoff
+BATCH_GET_MAX_KEYS = 100
+BATCH_GET_MAX_RETRIES = 5
+BATCH_GET_BACKOFF_SECONDS = 0.05
+
+# Most IDs one batch status request may ask for (a single BatchGetItem call)
+BATCH_STATUS_MAX_IDS = 100
+
 
 class StatusError(Exception):
     """Custom exception for status errors."""
     pass
 
 
+def _get_cached_status(blueprint_id: str) -> Optional[Dict[str, Any]]:
+    """Return a cached terminal status, dropping it if it has expired."""
+    cached = _STATUS_CACHE.get(blueprint_id)
+    if cached is None:
+        return None
+    expires_at, status_data = cached
+    if time.monotonic() < expires_at:
+        return status_data
+    del _STATUS_CACHE[blueprint_id]
+    return None
+
+
+def _cache_status(blueprint_id: str, status_data: Dict[str, Any]) -> None:
+    """Cache a status if it is terminal."""
+    if status_data.get('status') in TERMINAL_STATUSES:
+        if len(_STATUS_CACHE) >= STATUS_CACHE_MAX_ENTRIES:
+            del _STATUS_CACHE[next(iter(_STATUS_CACHE))]
+        _STATUS_CACHE[blueprint_id] = (time.monotonic() + STATUS_CACHE_TTL_SECONDS, status_data)
+
+
+def _decode_rooms(value: Binary) -> list:
+    """Decode detected rooms stored as gzipped JSON by the processing Lambda."""
+    return loads(gzip.decompress(value.value))
+
+
+def _deserialize_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a low-level DynamoDB item into plain Python values."""
+    status_data = {key: _deserializer.deserialize(value) for key, value in item.items()}
+    detected_rooms = status_data.get('detected_rooms')
+    if isinstance(detected_rooms, Binary):
+        status_data['detected_rooms'] = _decode_rooms(detected_rooms)
+    return status_data
+
+
 def get_status(blueprint_id: str) -> Optional[Dict[str, Any]]:
     """
     Get processing status from DynamoDB.
     
+    Completed and failed statuses are cached in memory for
+    STATUS_CACHE_TTL_SECONDS; non-terminal statuses are always re-read.
+    
     Args:
         blueprint_id: Unique blueprint identifier
         
     Returns:
         Status dictionary or None if not found
     """
+    cached = _get_cached_status(blueprint_id)
+    if cached is not None:
+        return cached
+    
     try:
-        table = dynamodb.Table(STATUS_TABLE_NAME)
-        response = table.get_item(
-            Key={'blueprint_id': blueprint_id}
+        response = dynamodb_client.get_item(
+            TableName=STATUS_TABLE_NAME,
+            Key={'blueprint_id': {'S': blueprint_id}},
+            ProjectionExpression=STATUS_PROJECTION,
+            ExpressionAttributeNames=STATUS_PROJECTION_NAMES
         )
         
-        if 'Item' in response:
-            return response['Item']
-        return None
+        if 'Item' not in response:
+            return None
+        
+        status_data = _deserialize_item(response['Item'])
+        _cache_status(blueprint_id, status_data)
+        return status_data
         
     except ClientError as e:
         raise StatusError(f"Failed to retrieve status: {str(e)}")
 
 
+def get_statuses(blueprint_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Get processing statuses for many blueprints with BatchGetItem.
+    
+    Args:
+        blueprint_ids: Blueprint identifiers to look up
+        
+    Returns:
+        Mapping of blueprint_id to status dictionary; missing blueprints are omitted
+    """
+    statuses = {}
+    pending = []
+    for blueprint_id in dict.fromkeys(blueprint_ids):
+        cached = _get_cached_status(blueprint_id)
+        if cached is not None:
+            statuses[blueprint_id] = cached
+        else:
+            pending.append(blueprint_id)
+    
+    try:
+        for start in range(0, len(pending), BATCH_GET_MAX_KEYS):
+            request_items = {
+                STATUS_TABLE_NAME: {
+                    'Keys': [
+                        {'blueprint_id': {'S': blueprint_id}}
+                        for blueprint_id in pending[start:start + BATCH_GET_MAX_KEYS]
+                    ],
+                    # blueprint_id is needed to match results back to requests
+                    'ProjectionExpression': f'blueprint_id, {STATUS_PROJECTION}',
+                    'ExpressionAttributeNames': STATUS_PROJECTION_NAMES
+                }
+            }
+            
+            for attempt in range(BATCH_GET_MAX_RETRIES + 1):
+                response = dynamodb_client.batch_get_item(RequestItems=request_items)
+                for item in response.get('Responses', {}).get(STATUS_TABLE_NAME, []):
+                    status_data = _deserialize_item(item)
+                    blueprint_id = status_data.pop('blueprint_id')
+                    _cache_status(blueprint_id, status_data)
+                    statuses[blueprint_id] = status_data
+                
+                request_items = response.get('UnprocessedKeys')
+                if not request_items:
+                    break
+                time.sleep(BATCH_GET_BACKOFF_SECONDS * (2 ** attempt))
+            else:
+                raise StatusError("Failed to retrieve status: unprocessed keys remained after retries")
+        
+        return statuses
+        
+    except ClientError as e:
+        raise StatusError(f"Failed to retrieve status: {str(e)}")
+
+
+def decimal_to_float(obj):
+    """Convert Decimal objects to float for JSON serialization."""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def format_status(blueprint_id: str, status_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the client-facing status body for one blueprint.
+    
+    Args:
+        blueprint_id: Unique blueprint identifier
+        status_data: Status dictionary from DynamoDB
+        
+    Returns:
+        Response body dictionary
+    """
+    status = status_data.get('status', 'unknown')
+    
+    if status == 'completed':
+        return {
+            'blueprint_id': blueprint_id,
+            'status': 'completed',
+            'processing_time_ms': status_data.get('processing_time_ms', 0),
+            'detected_rooms': status_data.get('detected_rooms', [])
+        }
+    if status == 'failed':
+        return {
+            'blueprint_id': blueprint_id,
+            'status': 'failed',
+            'error': status_data.get('error', 'processing_failed'),
+            'message': status_data.get('message', 'Processing failed')
+        }
+    # processing
+    return {
+        'blueprint_id': blueprint_id,
+        'status': 'processing',
+        'message': status_data.get('message', 'Analyzing blueprint...')
+    }
+
+
 def status_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     API Gateway handler for status polling endpoint.
@@ -66,11 +237,8 @@ def status_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         if not blueprint_id:
             return {
                 'statusCode': 400,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
+                'headers': JSON_CORS_HEADERS,
+                'body': dumps({
                     'error': 'missing_blueprint_id',
                     'message': 'blueprint_id is required in path'
                 })
@@ -82,58 +250,116 @@ def status_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         if not status_data:
             return {
                 'statusCode': 404,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
+                'headers': JSON_CORS_HEADERS,
+                'body': dumps({
                     'error': 'blueprint_not_found',
                     'message': f'Blueprint with ID {blueprint_id} not found',
                     'blueprint_id': blueprint_id
                 })
             }
         
-        # Format response based on status
-        status = status_data.get('status', 'unknown')
+        response_body = format_status(blueprint_id, status_data)
         
-        if status == 'completed':
-            response_body = {
-                'blueprint_id': blueprint_id,
-                'status': 'completed',
-                'processing_time_ms': status_data.get('processing_time_ms', 0),
-                'detected_rooms': status_data.get('detected_rooms', [])
-            }
-        elif status == 'failed':
-            response_body = {
-                'blueprint_id': blueprint_id,
-                'status': 'failed',
-                'error': status_data.get('error', 'processing_failed'),
-                'message': status_data.get('message', 'Processing failed')
+        return {
+            'statusCode': 200,
+            'headers': JSON_CORS_HEADERS,
+            'body': dumps(response_body, default=decimal_to_float)
+        }
+        
+    except StatusError as e:
+        return {
+            'statusCode': 500,
+            'headers': JSON_CORS_HEADERS,
+            'body': dumps({
+                'error': 'status_retrieval_failed',
+                'message': str(e)
+            })
+        }
+        
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': JSON_CORS_HEADERS,
+            'body': dumps({
+                'error': 'internal_error',
+                'message': f'An unexpected error occurred: {str(e)}'
+            })
+        }
+
+
+def batch_status_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    API Gateway handler for batch status polling (POST /blueprints/status/batch).
+    
+    At most BATCH_STATUS_MAX_IDS IDs are accepted per request. This route is
+    not deployed by aws/infrastructure/cloudformation.yaml, whose API sends
+    every path to the processing Lambda's router.
+    
+    Expected event structure:
+    {
+        "body": "{\"blueprint_ids\": [\"bp_abc123\", \"bp_def456\"]}"
+    }
+    
+    Returns:
+        API Gateway response format with one status entry per requested ID,
+        in request order
+    """
+    try:
+        raw_body = event.get('body') or ''
+        if event.get('isBase64Encoded'):
+            raw_body = base64.b64decode(raw_body)
+        
+        try:
+            blueprint_ids = json.loads(raw_body).get('blueprint_ids')
+        except (ValueError, AttributeError):
+            blueprint_ids = None
+        
+        if (not isinstance(blueprint_ids, list) or not blueprint_ids
+                or not all(isinstance(blueprint_id, str) for blueprint_id in blueprint_ids)):
+            return {
+                'statusCode': 400,
+                'headers': JSON_CORS_HEADERS,
+                'body': dumps({
+                    'error': 'invalid_request',
+                    'message': 'blueprint_ids must be a non-empty list of strings'
+                })
             }
-        else:  # processing
-            response_body = {
-                'blueprint_id': blueprint_id,
-                'status': 'processing',
-                'message': status_data.get('message', 'Analyzing blueprint...')
+        
+        if len(blueprint_ids) > BATCH_STATUS_MAX_IDS:
+            return {
+                'statusCode': 400,
+                'headers': JSON_CORS_HEADERS,
+                'body': dumps({
+                    'error': 'invalid_request',
+                    'message': f'At most {BATCH_STATUS_MAX_IDS} blueprint_ids may be requested at once'
+                })
             }
         
+        statuses = get_statuses(blueprint_ids)
+        
+        results = []
+        for blueprint_id in blueprint_ids:
+            status_data = statuses.get(blueprint_id)
+            if status_data is None:
+                results.append({
+                    'blueprint_id': blueprint_id,
+                    'error': 'blueprint_not_found',
+                    'message': f'Blueprint with ID {blueprint_id} not found'
+                })
+            else:
+                results.append(format_status(blueprint_id, status_data))
+        
         return {
             'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps(response_body)
+            'headers': JSON_CORS_HEADERS,
+            'body': dumps({'statuses': results}, default=decimal_to_float)
         }
         
     except StatusError as e:
         return {
             'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
+            'headers': JSON_CORS_HEADERS,
+            'body': dumps({
                 'error': 'status_retrieval_failed',
                 'message': str(e)
             })
@@ -142,13 +368,9 @@ def status_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     except Exception as e:
         return {
             'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
+            'headers': JSON_CORS_HEADERS,
+            'body': dumps({
                 'error': 'internal_error',
                 'message': f'An unexpected error occurred: {str(e)}'
             })
         }
-
@@ -1,23 +1,42 @@
 """
 Upload handler for API Gateway.
-Handles file uploads, stores them in S3, and triggers async Lambda processing.
+Handles file uploads and stores them in S3. Processing is triggered by the
+bucket's S3 event notification, so no Lambda invoke is needed here.
 """
 
-import json
 import base64
-import uuid
+import io
+import secrets
 import boto3
 import os
 from typing import Dict, Any
+from boto3.exceptions import S3UploadFailedError
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
 
+from api.middleware.serialization import JSON_CORS_HEADERS, dumps
+
 # Initialize AWS clients
 s3_client = boto3.client('s3')
-lambda_client = boto3.client('lambda')
 
 # Environment variables (set by API Gateway/Lambda)
 S3_BUCKET = os.environ.get('S3_BUCKET', 'room-detection-ai-blueprints-dev')
-PROCESSING_LAMBDA_NAME = os.environ.get('PROCESSING_LAMBDA_NAME', 'room-detection-processor')
+
+# Uploaded blueprints are stored under this prefix; the bucket only sends
+# ObjectCreated notifications for keys below it
+UPLOAD_PREFIX = 'uploads/'
+
+# Maximum accepted upload size
+MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+
+# Files at or above this size are uploaded as parallel multipart PUTs
+MULTIPART_THRESHOLD = 8 * 1024 * 1024  # 8MB
+S3_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=MULTIPART_THRESHOLD,
+    multipart_chunksize=MULTIPART_THRESHOLD,
+    max_concurrency=8,
+    use_threads=True
+)
 
 
 class UploadError(Exception):
@@ -27,7 +46,7 @@ class UploadError(Exception):
 
 def generate_blueprint_id() -> str:
     """Generate a unique blueprint ID."""
-    return f"bp_{uuid.uuid4().hex[:12]}"
+    return f"bp_{secrets.token_hex(6)}"
 
 
 def validate_file(file_content: bytes, content_type: str) -> None:
@@ -42,8 +61,7 @@ def validate_file(file_content: bytes, content_type: str) -> None:
         UploadError: If file is invalid
     """
     # Check file size (50MB limit)
-    max_size = 50 * 1024 * 1024  # 50MB
-    if len(file_content) > max_size:
+    if len(file_content) > MAX_FILE_SIZE:
         raise UploadError("file_too_large", f"File size exceeds 50MB limit. Size: {len(file_content)} bytes")
     
     # Check file type
@@ -71,48 +89,40 @@ def upload_to_s3(bucket: str, blueprint_id: str, file_content: bytes, content_ty
     """
     # Determine file extension from content type
     extension = 'png' if content_type == 'image/png' else 'jpg'
-    s3_key = f"uploads/{blueprint_id}/blueprint.{extension}"
+    # Random hex from the ID follows the upload prefix so keys spread across
+    # S3 partitions instead of all sharing one (and its request-rate ceiling)
+    s3_key = f"{UPLOAD_PREFIX}{blueprint_id[3:5]}/{blueprint_id}/blueprint.{extension}"
     
     try:
-        s3_client.put_object(
-            Bucket=bucket,
-            Key=s3_key,
-            Body=file_content,
-            ContentType=content_type,
-            Metadata={
-                'blueprint-id': blueprint_id
-            }
-        )
+        if len(file_content) < MULTIPART_THRESHOLD:
+            # Small files: a single PUT is cheapest
+            s3_client.put_object(
+                Bucket=bucket,
+                Key=s3_key,
+                Body=file_content,
+                ContentType=content_type,
+                Metadata={
+                    'blueprint-id': blueprint_id
+                }
+            )
+        else:
+            s3_client.upload_fileobj(
+                io.BytesIO(file_content),
+                Bucket=bucket,
+                Key=s3_key,
+                ExtraArgs={
+                    'ContentType': content_type,
+                    'Metadata': {
+                        'blueprint-id': blueprint_id
+                    }
+                },
+                Config=S3_TRANSFER_CONFIG
+            )
         return s3_key
-    except ClientError as e:
+    except (ClientError, S3UploadFailedError) as e:
         raise UploadError("s3_upload_failed", f"Failed to upload file to S3: {str(e)}")
 
 
-def trigger_async_processing(blueprint_id: str, s3_bucket: str, s3_key: str) -> None:
-    """
-    Trigger async Lambda function to process the image.
-    
-    Args:
-        blueprint_id: Unique blueprint identifier
-        s3_bucket: S3 bucket name
-        s3_key: S3 object key
-    """
-    payload = {
-        'blueprint_id': blueprint_id,
-        's3_bucket': s3_bucket,
-        's3_key': s3_key
-    }
-    
-    try:
-        lambda_client.invoke(
-            FunctionName=PROCESSING_LAMBDA_NAME,
-            InvocationType='Event',  # Async invocation
-            Payload=json.dumps(payload)
-        )
-    except ClientError as e:
-        raise UploadError("lambda_invocation_failed", f"Failed to trigger processing: {str(e)}")
-
-
 def upload_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     API Gateway handler for file upload endpoint.
@@ -132,14 +142,30 @@ def upload_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     try:
         # Get environment variables
         bucket = event.get('S3_BUCKET', S3_BUCKET)
-        lambda_name = event.get('PROCESSING_LAMBDA_NAME', PROCESSING_LAMBDA_NAME)
         
         # Parse multipart form data from API Gateway event
         # Note: API Gateway passes multipart data as base64-encoded body
-        if event.get('isBase64Encoded'):
-            body = base64.b64decode(event['body'])
+        raw_body = event['body']
+        is_base64 = event.get('isBase64Encoded')
+        
+        # Reject oversize uploads before paying for the decode and allocation
+        if is_base64:
+            # Every 4 base64 characters decode to 3 bytes, less the '=' padding
+            padding = raw_body[-2:].count('=' if isinstance(raw_body, str) else b'=')
+            body_size = (len(raw_body) * 3) // 4 - padding
         else:
-            body = event['body'].encode('utf-8') if isinstance(event['body'], str) else event['body']
+            body_size = len(raw_body)
+        if body_size > MAX_FILE_SIZE:
+            raise UploadError("file_too_large", f"File size exceeds 50MB limit. Size: {body_size} bytes")
+        
+        if is_base64:
+            body = base64.b64decode(raw_body)
+        elif isinstance(raw_body, (bytes, bytearray)):
+            # Binary media types deliver raw bytes; no codec pass needed
+            body = raw_body
+        else:
+            # latin-1 maps each code point to one byte, preserving binary data
+            body = raw_body.encode('latin-1')
         
         # Extract file from multipart form data
         # This is a simplified parser - in production, use a proper multipart parser
@@ -157,10 +183,8 @@ def upload_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         validate_file(body, content_type.split(';')[0].strip())
         
         # Upload to S3
-        s3_key = upload_to_s3(bucket, blueprint_id, body, content_type.split(';')[0].strip())
-        
-        # Trigger async processing
-        trigger_async_processing(blueprint_id, bucket, s3_key)
+        # The PUT fires the bucket's ObjectCreated notification, which starts processing
+        upload_to_s3(bucket, blueprint_id, body, content_type.split(';')[0].strip())
         
         # Return success response
         response_body = {
@@ -171,11 +195,8 @@ def upload_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         return {
             'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps(response_body)
+            'headers': JSON_CORS_HEADERS,
+            'body': dumps(response_body)
         }
         
     except UploadError as e:
@@ -190,11 +211,8 @@ def upload_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         return {
             'statusCode': status_code,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps(response_body)
+            'headers': JSON_CORS_HEADERS,
+            'body': dumps(response_body)
         }
         
     except Exception as e:
@@ -205,10 +223,7 @@ def upload_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         return {
             'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps(response_body)
+            'headers': JSON_CORS_HEADERS,
+            'body': dumps(response_body)
         }
 
@@ -3,10 +3,17 @@ Error handling middleware for API Gateway handlers.
 Provides standardized error response formatting.
 """
 
-import json
-import traceback
+import logging
+import os
 from typing import Dict, Any, Callable
 
+from api.middleware.serialization import JSON_CORS_HEADERS, dumps
+
+logger = logging.getLogger(__name__)
+
+# Tracebacks and exception details are only emitted when debugging
+_DEBUG = os.environ.get('LOG_LEVEL', 'INFO').upper() == 'DEBUG'
+
 
 def create_error_response(
     error_code: str,
@@ -41,11 +48,8 @@ def create_error_response(
     
     return {
         'statusCode': status_code,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*'
-        },
-        'body': json.dumps(error_body)
+        'headers': JSON_CORS_HEADERS,
+        'body': dumps(error_body)
     }
 
 
@@ -84,13 +88,16 @@ def error_handler_middleware(handler: Callable) -> Callable:
                 status_code=403
             )
         except Exception as e:
-            # Unexpected errors - log full traceback
-            traceback.print_exc()
+            # Unexpected errors - full traceback only when debugging
+            if _DEBUG:
+                logger.exception("Unhandled error in handler")
+            else:
+                logger.error("Unhandled error in handler: %s", e)
             return create_error_response(
                 error_code='internal_error',
                 message='An unexpected error occurred',
                 status_code=500,
-                details=str(e) if __debug__ else None
+                details=str(e) if _DEBUG else None
             )
     
     return wrapped_handler
@@ -0,0 +1,36 @@
+"""
+JSON serialization shared by the API Gateway handlers.
+Uses orjson when it is installed and falls back to the standard library.
+"""
+
+import json
+from typing import Any, Callable
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Headers for every JSON response
+JSON_CORS_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*'
+}
+
+# No whitespace in serialized response bodies
+_JSON_SEPARATORS = (',', ':')
+
+
+def dumps(obj: Any, default: Callable = None) -> str:
+    """Serialize a response body, preferring orjson when it is available."""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, default=default).decode('utf-8')
+    return json.dumps(obj, separators=_JSON_SEPARATORS, default=default)
+
+
+def loads(data) -> Any:
+    """Parse a JSON document from str or bytes."""
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -4,10 +4,11 @@ API tests for upload and status endpoints.
 
 import json
 import base64
+import gzip
 import pytest
 from unittest.mock import Mock, patch, MagicMock
-from api.handlers.upload_handler import upload_handler, generate_blueprint_id, validate_file
-from api.handlers.status_handler import status_handler, get_status
+from api.handlers.upload_handler import upload_handler, generate_blueprint_id, validate_file, upload_to_s3, MAX_FILE_SIZE
+from api.handlers.status_handler import status_handler, batch_status_handler, get_status, _STATUS_CACHE
 
 
 class TestUploadHandler:
@@ -46,15 +47,22 @@ class TestUploadHandler:
         assert 'invalid_file_format' in str(exc_info.value) or 'PNG or JPG' in str(exc_info.value)
     
     @patch('api.handlers.upload_handler.s3_client')
-    @patch('api.handlers.upload_handler.lambda_client')
-    def test_upload_handler_success(self, mock_lambda, mock_s3):
+    def test_upload_to_s3_large_file_uses_multipart(self, mock_s3):
+        """Test that large files go through the multipart transfer."""
+        large_content = b'\x89PNG' + b'0' * (8 * 1024 * 1024)
+        
+        s3_key = upload_to_s3('test-bucket', 'bp_test123', large_content, 'image/png')
+        
+        assert s3_key == 'uploads/te/bp_test123/blueprint.png'
+        mock_s3.upload_fileobj.assert_called_once()
+        mock_s3.put_object.assert_not_called()
+    
+    @patch('api.handlers.upload_handler.s3_client')
+    def test_upload_handler_success(self, mock_s3):
         """Test successful upload handler."""
         # Mock S3 upload
         mock_s3.put_object.return_value = {}
         
-        # Mock Lambda invocation
-        mock_lambda.invoke.return_value = {'StatusCode': 202}
-        
         # Create test event
         png_content = b'\x89PNG\r\n\x1a\n' + b'0' * 1000
         encoded_body = base64.b64encode(png_content).decode('utf-8')
@@ -76,6 +84,39 @@ class TestUploadHandler:
         assert body['status'] == 'processing'
         assert body['message'] == 'Blueprint uploaded successfully. Processing started.'
     
+    @patch('api.handlers.upload_handler.base64.b64decode')
+    def test_upload_handler_too_large_skips_decode(self, mock_b64decode):
+        """Test that oversize base64 bodies are rejected before decoding."""
+        event = {
+            'body': 'A' * (70 * 1024 * 1024),
+            'isBase64Encoded': True,
+            'headers': {
+                'Content-Type': 'image/png'
+            }
+        }
+        
+        response = upload_handler(event, None)
+        
+        assert response['statusCode'] == 413
+        body = json.loads(response['body'])
+        assert body['error'] == 'file_too_large'
+        mock_b64decode.assert_not_called()
+    
+    def test_upload_handler_size_check_allows_max_file_size(self):
+        """Test a base64 body decoding to exactly MAX_FILE_SIZE passes the size pre-check."""
+        event = {
+            'body': base64.b64encode(bytes(MAX_FILE_SIZE)).decode('ascii'),
+            'isBase64Encoded': True,
+            'headers': {
+                'Content-Type': 'image/png'
+            }
+        }
+        
+        response = upload_handler(event, None)
+        
+        assert response['statusCode'] != 413
+        assert json.loads(response['body'])['error'] != 'file_too_large'
+    
     def test_upload_handler_invalid_file(self):
         """Test upload handler with invalid file."""
         event = {
@@ -95,19 +136,19 @@ class TestUploadHandler:
 class TestStatusHandler:
     """Tests for status handler."""
     
-    @patch('api.handlers.status_handler.dynamodb')
-    def test_status_handler_processing(self, mock_dynamodb):
+    def setup_method(self):
+        _STATUS_CACHE.clear()
+    
+    @patch('api.handlers.status_handler.dynamodb_client')
+    def test_status_handler_processing(self, mock_client):
         """Test status handler with processing status."""
         # Mock DynamoDB table
-        mock_table = MagicMock()
-        mock_table.get_item.return_value = {
+        mock_client.get_item.return_value = {
             'Item': {
-                'blueprint_id': 'bp_test123',
-                'status': 'processing',
-                'message': 'Analyzing blueprint...'
+                'status': {'S': 'processing'},
+                'message': {'S': 'Analyzing blueprint...'}
             }
         }
-        mock_dynamodb.Table.return_value = mock_table
         
         event = {
             'pathParameters': {
@@ -122,25 +163,22 @@ class TestStatusHandler:
         assert body['blueprint_id'] == 'bp_test123'
         assert body['status'] == 'processing'
     
-    @patch('api.handlers.status_handler.dynamodb')
-    def test_status_handler_completed(self, mock_dynamodb):
+    @patch('api.handlers.status_handler.dynamodb_client')
+    def test_status_handler_completed(self, mock_client):
         """Test status handler with completed status."""
-        mock_table = MagicMock()
-        mock_table.get_item.return_value = {
+        mock_client.get_item.return_value = {
             'Item': {
-                'blueprint_id': 'bp_test123',
-                'status': 'completed',
-                'processing_time_ms': 15420,
-                'detected_rooms': [
-                    {
-                        'id': 'room_001',
-                        'bounding_box': [50, 50, 200, 300],
-                        'confidence': 0.95
-                    }
-                ]
+                'status': {'S': 'completed'},
+                'processing_time_ms': {'N': '15420'},
+                'detected_rooms': {'L': [
+                    {'M': {
+                        'id': {'S': 'room_001'},
+                        'bounding_box': {'L': [{'N': '50'}, {'N': '50'}, {'N': '200'}, {'N': '300'}]},
+                        'confidence': {'N': '0.95'}
+                    }}
+                ]}
             }
         }
-        mock_dynamodb.Table.return_value = mock_table
         
         event = {
             'pathParameters': {
@@ -156,12 +194,49 @@ class TestStatusHandler:
         assert 'detected_rooms' in body
         assert 'processing_time_ms' in body
     
-    @patch('api.handlers.status_handler.dynamodb')
-    def test_status_handler_not_found(self, mock_dynamodb):
+    @patch('api.handlers.status_handler.dynamodb_client')
+    def test_status_handler_completed_compressed_rooms(self, mock_client):
+        """Test detected rooms stored as gzipped JSON are decoded."""
+        rooms = [{'id': 'room_001', 'bounding_box': [50, 50, 200, 300], 'confidence': 0.95}]
+        mock_client.get_item.return_value = {
+            'Item': {
+                'status': {'S': 'completed'},
+                'processing_time_ms': {'N': '15420'},
+                'detected_rooms': {'B': gzip.compress(json.dumps(rooms).encode('utf-8'))}
+            }
+        }
+        
+        response = status_handler({'pathParameters': {'blueprint_id': 'bp_test123'}}, None)
+        
+        assert response['statusCode'] == 200
+        assert json.loads(response['body'])['detected_rooms'] == rooms
+    
+    @patch('api.handlers.status_handler.dynamodb_client')
+    def test_get_status_caches_terminal_status(self, mock_client):
+        """Test repeat polls of a terminal status skip DynamoDB."""
+        mock_client.get_item.return_value = {
+            'Item': {'status': {'S': 'failed'}, 'error': {'S': 'processing_failed'}}
+        }
+        
+        assert get_status('bp_test123')['status'] == 'failed'
+        assert get_status('bp_test123')['status'] == 'failed'
+        mock_client.get_item.assert_called_once()
+    
+    @patch('api.handlers.status_handler.dynamodb_client')
+    def test_get_status_does_not_cache_processing(self, mock_client):
+        """Test non-terminal statuses are re-read on every poll."""
+        mock_client.get_item.return_value = {
+            'Item': {'status': {'S': 'processing'}}
+        }
+        
+        get_status('bp_test123')
+        get_status('bp_test123')
+        assert mock_client.get_item.call_count == 2
+    
+    @patch('api.handlers.status_handler.dynamodb_client')
+    def test_status_handler_not_found(self, mock_client):
         """Test status handler with non-existent blueprint."""
-        mock_table = MagicMock()
-        mock_table.get_item.return_value = {}
-        mock_dynamodb.Table.return_value = mock_table
+        mock_client.get_item.return_value = {}
         
         event = {
             'pathParameters': {
@@ -186,6 +261,55 @@ class TestStatusHandler:
         assert response['statusCode'] == 400
         body = json.loads(response['body'])
         assert 'error' in body
+    
+    @patch('api.handlers.status_handler.time.sleep')
+    @patch('api.handlers.status_handler.dynamodb_client')
+    def test_batch_status_handler_retries_unprocessed_keys(self, mock_client, mock_sleep):
+        """Test batch status lookups retry unprocessed keys."""
+        table = 'room-detection-status'
+        blueprint_ids = [f'bp_{i:03d}' for i in range(99)]
+        
+        def batch_get_item(RequestItems):
+            keys = [key['blueprint_id']['S'] for key in RequestItems[table]['Keys']]
+            items = [
+                {'blueprint_id': {'S': key}, 'status': {'S': 'processing'}}
+                for key in keys if key not in ('bp_000', 'bp_missing')
+            ]
+            unprocessed = {table: {'Keys': [{'blueprint_id': {'S': 'bp_000'}}]}} if len(keys) == 100 else {}
+            if keys == ['bp_000']:
+                items = [{'blueprint_id': {'S': 'bp_000'}, 'status': {'S': 'completed'}}]
+            return {'Responses': {table: items}, 'UnprocessedKeys': unprocessed}
+        
+        mock_client.batch_get_item.side_effect = batch_get_item
+        event = {'body': json.dumps({'blueprint_ids': blueprint_ids + ['bp_missing']})}
+        
+        response = batch_status_handler(event, None)
+        
+        assert response['statusCode'] == 200
+        statuses = json.loads(response['body'])['statuses']
+        assert [entry['blueprint_id'] for entry in statuses] == blueprint_ids + ['bp_missing']
+        assert statuses[0]['status'] == 'completed'
+        assert statuses[1]['status'] == 'processing'
+        assert statuses[-1]['error'] == 'blueprint_not_found'
+        assert mock_client.batch_get_item.call_count == 2
+    
+    def test_batch_status_handler_invalid_body(self):
+        """Test batch status handler rejects a missing ID list."""
+        response = batch_status_handler({'body': '{}'}, None)
+        
+        assert response['statusCode'] == 400
+        assert json.loads(response['body'])['error'] == 'invalid_request'
+    
+    @patch('api.handlers.status_handler.dynamodb_client')
+    def test_batch_status_handler_too_many_ids(self, mock_client):
+        """Test batch status handler rejects more than 100 IDs without reading DynamoDB."""
+        event = {'body': json.dumps({'blueprint_ids': [f'bp_{i:03d}' for i in range(101)]})}
+        
+        response = batch_status_handler(event, None)
+        
+        assert response['statusCode'] == 400
+        assert json.loads(response['body'])['error'] == 'invalid_request'
+        mock_client.batch_get_item.assert_not_called()
 
 
 if __name__ == '__main__':
@@ -8,8 +8,29 @@ from the cubicasa5k_coco dataset.
 
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from collections import defaultdict
+
+import numpy as np
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import ijson
+    HAS_IJSON = True
+except ImportError:
+    HAS_IJSON = False
+
+# Flags for creating (or truncating) an empty label file
+_EMPTY_LABEL_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+
+# YOLO label line, applied with map(_YOLO_LINE.__mod__, rows) to skip the
+# per-line generator frame and attribute lookups of an inline f-string
+_YOLO_LINE = "%d %.6f %.6f %.6f %.6f\n"
 
 def coco_bbox_to_yolo(bbox, img_width, img_height):
     """
@@ -35,7 +56,99 @@ def coco_bbox_to_yolo(bbox, img_width, img_height):
     
     return center_x, center_y, width_norm, height_norm
 
-def convert_coco_to_yolo(coco_json_path, output_dir, category_filter=None):
+def coco_bboxes_to_yolo(bboxes, widths, heights):
+    """
+    Vectorized coco_bbox_to_yolo over many boxes at once.
+    
+    Args:
+        bboxes: (N, 4) array of COCO bboxes [x, y, width, height] in absolute pixels
+        widths: (N,) array of image widths, one per bbox
+        heights: (N,) array of image heights, one per bbox
+    
+    Returns:
+        (N, 4) array of (center_x, center_y, width, height) normalized to 0-1
+    """
+    yolo = np.empty_like(bboxes, dtype=np.float64)
+    yolo[:, 0] = (bboxes[:, 0] + bboxes[:, 2] * 0.5) / widths
+    yolo[:, 1] = (bboxes[:, 1] + bboxes[:, 3] * 0.5) / heights
+    yolo[:, 2] = bboxes[:, 2] / widths
+    yolo[:, 3] = bboxes[:, 3] / heights
+    return yolo
+
+def iter_coco_items(coco_json_path, prefix):
+    """
+    Stream items from a COCO JSON array without loading the whole file.
+    
+    Args:
+        coco_json_path: Path to COCO format JSON file
+        prefix: ijson prefix of the items to yield (e.g. 'images.item')
+    
+    Yields:
+        One parsed dict per array element
+    """
+    with open(coco_json_path, 'rb') as f:
+        yield from ijson.items(f, prefix, use_float=True)
+
+def label_file_name(image_id, file_name):
+    """
+    Build a unique YOLO label file name for an image.
+    
+    Args:
+        image_id: COCO image ID
+        file_name: COCO image file_name (may include folders)
+    
+    Returns:
+        Label file name, e.g. "12345_F1_scaled.txt"
+    """
+    # Get base filename without extension
+    # Extract unique identifier from path (e.g., folder number) or use image_id
+    path_parts = Path(file_name).parts
+    base_name = Path(file_name).stem
+    
+    # If all files have the same name, use image_id to make them unique
+    # Try to extract folder ID from path, otherwise use image_id
+    if len(path_parts) > 1:
+        # Try to get a unique part from the path (e.g., folder number)
+        folder_id = path_parts[-2] if len(path_parts) >= 2 else str(image_id)
+        unique_name = f"{folder_id}_{base_name}"
+    else:
+        unique_name = f"{image_id}_{base_name}"
+    
+    return f"{unique_name}.txt"
+
+def write_label_chunk(chunk):
+    """
+    Write YOLO label files for one chunk of images.
+    
+    Args:
+        chunk: Tuple (output_dir, label_names, starts, ends, class_ids, yolo_bboxes)
+               where starts/ends index each image's rows in class_ids/yolo_bboxes
+    
+    Returns:
+        Number of non-empty label files written
+    """
+    output_dir, label_names, starts, ends, class_ids, yolo_bboxes = chunk
+    output_dir = Path(output_dir)
+    # Format every annotation line in the chunk once, then join per file
+    lines = list(map(_YOLO_LINE.__mod__, zip(class_ids.tolist(), *yolo_bboxes.T.tolist())))
+    converted = 0
+    
+    for label_name, start, end in zip(label_names, starts.tolist(), ends.tolist()):
+        label_file = output_dir / label_name
+        
+        if start == end:
+            # Create empty file if no annotations (a bare open, without
+            # touch()'s extra stat/utime calls; also clears stale labels)
+            os.close(os.open(label_file, _EMPTY_LABEL_FLAGS, 0o644))
+            continue
+        
+        # Write YOLO format annotations with one write per file
+        label_file.write_text("".join(lines[start:end]))
+        converted += 1
+    
+    return converted
+
+def convert_coco_to_yolo(coco_json_path, output_dir, category_filter=None, stream=False, workers=None):
     """
     Convert COCO format annotations to YOLO format label files.
     
@@ -44,90 +157,131 @@ def convert_coco_to_yolo(coco_json_path, output_dir, category_filter=None):
         output_dir: Directory to save YOLO format .txt label files
         category_filter: List of category IDs to include (None = all categories)
                        For rooms only, use [2]
+        stream: Stream-parse the JSON with ijson (two passes over the file)
+                instead of loading it whole; keeps peak memory low for very
+                large annotation files
+        workers: Number of processes writing label files (None = one per CPU,
+                 1 = write in this process)
     
     Returns:
         Dictionary with conversion statistics
     """
-    # Load COCO annotations
-    with open(coco_json_path, 'r') as f:
-        coco_data = json.load(f)
+    if stream and not HAS_IJSON:
+        print("Warning: ijson not installed, loading COCO file into memory")
+        stream = False
+    
+    if stream:
+        # Images first, then annotations, so the parsed tree is never materialized
+        images = iter_coco_items(coco_json_path, 'images.item')
+        annotations = iter_coco_items(coco_json_path, 'annotations.item')
+    else:
+        # Load COCO annotations (orjson parses large COCO files several times faster)
+        if HAS_ORJSON:
+            coco_data = orjson.loads(Path(coco_json_path).read_bytes())
+        else:
+            with open(coco_json_path, 'r') as f:
+                coco_data = json.load(f)
+        images = coco_data['images']
+        annotations = coco_data['annotations']
     
     # Create output directory
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    # Build mappings
-    images = {img['id']: img for img in coco_data['images']}
-    categories = {cat['id']: cat for cat in coco_data['categories']}
+    # Images as parallel arrays
+    image_ids = []
+    widths = []
+    heights = []
+    file_names = []
+    for img in images:
+        image_ids.append(img['id'])
+        widths.append(img['width'])
+        heights.append(img['height'])
+        file_names.append(img['file_name'])
+    image_ids = np.array(image_ids, dtype=np.int64)
+    widths = np.array(widths, dtype=np.float64)
+    heights = np.array(heights, dtype=np.float64)
+    
+    # Annotations as parallel arrays, filtered by category if specified
+    ann_image_ids = []
+    ann_category_ids = []
+    ann_bboxes = []
+    for ann in annotations:
+        ann_image_ids.append(ann['image_id'])
+        ann_category_ids.append(ann['category_id'])
+        ann_bboxes.append(ann['bbox'])
+    ann_image_ids = np.array(ann_image_ids, dtype=np.int64)
+    ann_category_ids = np.array(ann_category_ids, dtype=np.int64)
+    ann_bboxes = np.array(ann_bboxes, dtype=np.float64).reshape(-1, 4)
     
-    # Filter annotations by category if specified
-    annotations = coco_data['annotations']
     if category_filter:
-        annotations = [ann for ann in annotations if ann['category_id'] in category_filter]
+        keep = np.isin(ann_category_ids, category_filter)
+        ann_image_ids = ann_image_ids[keep]
+        ann_category_ids = ann_category_ids[keep]
+        ann_bboxes = ann_bboxes[keep]
     
-    # Group annotations by image_id
-    annotations_by_image = defaultdict(list)
-    for ann in annotations:
-        annotations_by_image[ann['image_id']].append(ann)
+    # Sort by image_id (stable, so per-image annotation order is preserved)
+    # and locate each image's slice with a binary search instead of a dict
+    order = np.argsort(ann_image_ids, kind='stable')
+    ann_image_ids = ann_image_ids[order]
+    ann_category_ids = ann_category_ids[order]
+    ann_bboxes = ann_bboxes[order]
+    starts = np.searchsorted(ann_image_ids, image_ids, side='left')
+    ends = np.searchsorted(ann_image_ids, image_ids, side='right')
+    
+    # Gather each annotation's image size through an image_id -> row lookup,
+    # then convert every bbox in one pass. A padding row catches image_ids
+    # past the last image; annotations without a matching image fall outside
+    # every slice above and are never written.
+    image_order = np.argsort(image_ids, kind='stable')
+    ann_rows = np.append(image_order, len(image_ids))[
+        np.searchsorted(image_ids[image_order], ann_image_ids)
+    ]
+    yolo_bboxes = coco_bboxes_to_yolo(
+        ann_bboxes,
+        np.append(widths, 1.0)[ann_rows],
+        np.append(heights, 1.0)[ann_rows]
+    )
+    
+    # YOLO format: class_id center_x center_y width height
+    # Note: For room detection, we typically use class 0 for rooms
+    # If you want to keep category IDs, use: category_id - 1 (YOLO uses 0-indexed)
+    # For rooms only (category_id=2), this becomes class 0
+    class_ids = np.where(ann_category_ids > 0, ann_category_ids - 1, 0)
     
     # Convert each image's annotations to YOLO format
     stats = {
-        'total_images': len(images),
-        'images_with_annotations': len(annotations_by_image),
-        'total_annotations': len(annotations),
+        'total_images': len(image_ids),
+        'images_with_annotations': len(np.unique(ann_image_ids)),
+        'total_annotations': len(ann_image_ids),
         'converted_files': 0
     }
     
-    for image_id, image_info in images.items():
-        img_width = image_info['width']
-        img_height = image_info['height']
-        file_name = image_info['file_name']
-        
-        # Get base filename without extension
-        # Extract unique identifier from path (e.g., folder number) or use image_id
-        path_parts = Path(file_name).parts
-        base_name = Path(file_name).stem
-        
-        # If all files have the same name, use image_id to make them unique
-        # Try to extract folder ID from path, otherwise use image_id
-        if len(path_parts) > 1:
-            # Try to get a unique part from the path (e.g., folder number)
-            folder_id = path_parts[-2] if len(path_parts) >= 2 else str(image_id)
-            unique_name = f"{folder_id}_{base_name}"
-        else:
-            unique_name = f"{image_id}_{base_name}"
-        
-        # Create YOLO label file
-        label_file = output_dir / f"{unique_name}.txt"
-        
-        # Get annotations for this image
-        img_annotations = annotations_by_image.get(image_id, [])
-        
-        if not img_annotations:
-            # Create empty file if no annotations
-            label_file.touch()
-            continue
-        
-        # Write YOLO format annotations
-        with open(label_file, 'w') as f:
-            for ann in img_annotations:
-                category_id = ann['category_id']
-                bbox = ann['bbox']
-                
-                # Convert COCO bbox to YOLO format
-                center_x, center_y, width_norm, height_norm = coco_bbox_to_yolo(
-                    bbox, img_width, img_height
-                )
-                
-                # YOLO format: class_id center_x center_y width height
-                # Note: For room detection, we typically use class 0 for rooms
-                # If you want to keep category IDs, use: category_id - 1 (YOLO uses 0-indexed)
-                # For rooms only (category_id=2), this becomes class 0
-                class_id = category_id - 1 if category_id > 0 else 0
-                
-                f.write(f"{class_id} {center_x:.6f} {center_y:.6f} {width_norm:.6f} {height_norm:.6f}\n")
-        
-        stats['converted_files'] += 1
+    # Split images (in image_id order) into chunks. Each chunk then covers one
+    # contiguous slice of the sorted annotations, so a worker is only sent its
+    # own slice of the label arrays.
+    workers = workers or os.cpu_count() or 1
+    chunk_size = max(1, -(-len(image_ids) // (workers * 4)))
+    chunks = []
+    for chunk_start in range(0, len(image_ids), chunk_size):
+        rows = image_order[chunk_start:chunk_start + chunk_size]
+        chunk_starts = starts[rows]
+        chunk_ends = ends[rows]
+        lo, hi = int(chunk_starts[0]), int(chunk_ends[-1])
+        chunks.append((
+            str(output_dir),
+            [label_file_name(image_ids[row], file_names[row]) for row in rows.tolist()],
+            chunk_starts - lo,
+            chunk_ends - lo,
+            class_ids[lo:hi],
+            yolo_bboxes[lo:hi]
+        ))
+    
+    if workers == 1 or len(chunks) <= 1:
+        stats['converted_files'] = sum(map(write_label_chunk, chunks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            stats['converted_files'] = sum(executor.map(write_label_chunk, chunks))
     
     return stats
 
@@ -153,6 +307,17 @@ def main():
         action='store_true',
         help='Only convert room annotations (category_id=2), ignore walls'
     )
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Stream-parse the COCO JSON with ijson to reduce peak memory'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Processes used to write label files (default: one per CPU)'
+    )
     
     args = parser.parse_args()
     
@@ -168,7 +333,9 @@ def main():
     stats = convert_coco_to_yolo(
         args.coco_json,
         args.output_dir,
-        category_filter=category_filter
+        category_filter=category_filter,
+        stream=args.stream,
+        workers=args.workers
     )
     
     print("=" * 60)
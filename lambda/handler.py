@@ -4,20 +4,38 @@ Handles image preprocessing, SageMaker endpoint invocation, and response formatt
 Also handles API Gateway upload events with multipart form data parsing.
 """
 
+import io
 import json
+import logging
 import os
-import base64
+import binascii
 import time
-import uuid
-import re
+import secrets
 import boto3
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
 from typing import Dict, Any, Optional, Tuple
+from urllib.parse import unquote_plus
+from boto3.exceptions import S3UploadFailedError
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
+from utils.aws_min import invoke_endpoint, AwsRequestError
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Verbose request tracing is logged at DEBUG; set LOG_LEVEL=DEBUG to see it
+logger = logging.getLogger(__name__)
+logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
 
 # Lazy imports to avoid loading Pillow/NumPy for upload-only operations
-_preprocess_image = None
-_get_image_dimensions = None
+_load_and_preprocess = None
 _transform_coordinates_to_normalized = None
+_transform_bounding_boxes = None
 _status_manager = None
 
 def get_status_manager():
@@ -28,21 +46,13 @@ def get_status_manager():
         _status_manager = _get_sm()
     return _status_manager
 
-def preprocess_image(*args, **kwargs):
-    """Lazy load and call preprocess_image."""
-    global _preprocess_image
-    if _preprocess_image is None:
-        from utils.image_processor import preprocess_image as _pi
-        _preprocess_image = _pi
-    return _preprocess_image(*args, **kwargs)
-
-def get_image_dimensions(*args, **kwargs):
-    """Lazy load and call get_image_dimensions."""
-    global _get_image_dimensions
-    if _get_image_dimensions is None:
-        from utils.image_processor import get_image_dimensions as _gid
-        _get_image_dimensions = _gid
-    return _get_image_dimensions(*args, **kwargs)
+def load_and_preprocess(*args, **kwargs):
+    """Lazy load and call load_and_preprocess."""
+    global _load_and_preprocess
+    if _load_and_preprocess is None:
+        from utils.image_processor import load_and_preprocess as _lp
+        _load_and_preprocess = _lp
+    return _load_and_preprocess(*args, **kwargs)
 
 def transform_coordinates_to_normalized(*args, **kwargs):
     """Lazy load and call transform_coordinates_to_normalized."""
@@ -52,20 +62,103 @@ def transform_coordinates_to_normalized(*args, **kwargs):
         _transform_coordinates_to_normalized = _tc
     return _transform_coordinates_to_normalized(*args, **kwargs)
 
+def transform_bounding_boxes(*args, **kwargs):
+    """Lazy load and call transform_bounding_boxes."""
+    global _transform_bounding_boxes
+    if _transform_bounding_boxes is None:
+        from utils.coordinate_transformer import transform_bounding_boxes as _tb
+        _transform_bounding_boxes = _tb
+    return _transform_bounding_boxes(*args, **kwargs)
+
 
-# Initialize AWS clients
+# AWS clients are created on first use so cold starts and requests that
+# don't touch a service skip building its client.
 # AWS_REGION is automatically provided by Lambda runtime, use boto3's default session
-sagemaker_runtime = boto3.client('sagemaker-runtime')
-s3_client = boto3.client('s3')
-lambda_client = boto3.client('lambda')
+_clients = {}
+
+# Keep-alive connections are reused by warm invocations; short connect and
+# read timeouts with one retry fail fast instead of eating the Lambda timeout
+_CLIENT_CONFIG = Config(
+    max_pool_connections=4,
+    tcp_keepalive=True,
+    retries={'total_max_attempts': 2, 'mode': 'standard'},
+    connect_timeout=2,
+    read_timeout=30
+)
+
+
+def _c(name: str):
+    """Get a boto3 client for a service, creating it on first use."""
+    client = _clients.get(name)
+    if client is None:
+        client = _clients[name] = boto3.client(name, config=_CLIENT_CONFIG)
+    return client
+
 
 # Environment variables
 SAGEMAKER_ENDPOINT_NAME = os.environ.get('SAGEMAKER_ENDPOINT_NAME', 'room-detection-yolov8-endpoint')
 S3_BUCKET = os.environ.get('S3_BUCKET', 'room-detection-ai-blueprints-dev')
-PROCESSING_LAMBDA_NAME = os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'room-detection-ai-handler-dev')
+# Import the image stack during INIT (set to 'false' for upload/status-only deployments)
+EAGER_IMPORTS = os.environ.get('EAGER_IMPORTS', 'true').lower() == 'true'
+
+# Uploaded blueprints are stored under this prefix; the bucket only sends
+# ObjectCreated notifications for keys below it
+UPLOAD_PREFIX = 'uploads/'
+
+# Largest image accepted for upload or processing
+MAX_IMAGE_BYTES = 50 * 1024 * 1024  # 50MB
+
+# Largest upload request body: the image plus room for multipart framing
+MAX_UPLOAD_BODY_BYTES = MAX_IMAGE_BYTES + 64 * 1024
+
+# Uploads above this size are sent as parallel 8MB multipart PUTs
+MULTIPART_UPLOAD_THRESHOLD = 16 * 1024 * 1024  # 16MB
+S3_UPLOAD_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=4,
+    use_threads=True
+)
 
-# Initialize status manager
-status_manager = get_status_manager()
+# Threads for overlapping independent AWS calls, reused across warm invocations
+_IO_POOL = ThreadPoolExecutor(max_workers=2)
+
+# Multipart framing and image signature bytes
+_CRLF = b'\r\n'
+_LF = b'\n'
+_BOUNDARY_PREFIX = b'--'
+_FILENAME_PARAM = b'filename='
+_CONTENT_TYPE_HEADER = b'content-type'
+_PNG_MAGIC = 0x89504E47  # \x89PNG
+_JPEG_MAGIC = 0xFFD8  # SOI marker
+
+# Headers for every API Gateway response
+_CORS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key',
+    'Access-Control-Allow-Methods': 'GET,POST,OPTIONS',
+    'Content-Type': 'application/json'
+}
+
+# No whitespace in serialized response bodies
+_JSON_SEPARATORS = (',', ':')
+
+# The inference container letterboxes to 640x640 itself, so images are sent
+# as uploaded; set CLIENT_SIDE_RESIZE=true to resize in Lambda instead
+CLIENT_SIDE_RESIZE = os.environ.get('CLIENT_SIDE_RESIZE', 'false').lower() == 'true'
+
+# Larger images are resized here to stay under the endpoint's request limit
+# (4MB for serverless inference)
+SAGEMAKER_MAX_RAW_BYTES = 4 * 1024 * 1024
+
+# Model input size for client-side resizing
+SAGEMAKER_INPUT_SIZE = (640, 640)
+
+# JPEG encodes a 640x640 RGB frame far faster than PNG's deflate and is smaller
+SAGEMAKER_JPEG_QUALITY = 90
+
+# Encode buffer reused across warm invocations
+_IMG_BUF = io.BytesIO()
 
 
 class LambdaError(Exception):
@@ -73,12 +166,84 @@ class LambdaError(Exception):
     pass
 
 
+class _BufferReader(io.RawIOBase):
+    """
+    Seekable read-only file object over a bytes-like buffer.
+    
+    Unlike io.BytesIO, wrapping a memoryview slice does not copy it; boto3
+    only accepts file objects (not memoryviews) for request bodies.
+    """
+    
+    def __init__(self, buffer):
+        self._view = memoryview(buffer)
+        self._pos = 0
+    
+    def readable(self) -> bool:
+        return True
+    
+    def seekable(self) -> bool:
+        return True
+    
+    def readinto(self, b) -> int:
+        chunk = self._view[self._pos:self._pos + len(b)]
+        b[:len(chunk)] = chunk
+        self._pos += len(chunk)
+        return len(chunk)
+    
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(offset, 0)
+        return self._pos
+    
+    def tell(self) -> int:
+        return self._pos
+
+
+def _dumps(obj: Any, default=None) -> str:
+    """Serialize a response body, preferring orjson when it is available."""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, default=default).decode('utf-8')
+    return json.dumps(obj, separators=_JSON_SEPARATORS, default=default)
+
+
+# Bodies of fixed error responses, serialized once at import
+_NOT_BASE64_BODY = _dumps({
+    'error': 'invalid_request',
+    'message': 'Request body was not base64-encoded. Configure API Gateway binary media types to include multipart/form-data.'
+})
+_EMPTY_BODY = _dumps({
+    'error': 'invalid_request',
+    'message': 'Request body is empty'
+})
+_NO_FILE_BODY = _dumps({
+    'error': 'invalid_request',
+    'message': 'No file found in multipart request. Please ensure you are sending a file with the field name "file".'
+})
+_MISSING_PATH_BLUEPRINT_ID_BODY = _dumps({
+    'error': 'missing_blueprint_id',
+    'message': 'blueprint_id is required in path'
+})
+_MISSING_BLUEPRINT_ID_BODY = _dumps({
+    'blueprint_id': 'unknown',
+    'status': 'failed',
+    'error': 'missing_blueprint_id',
+    'message': 'blueprint_id is required'
+})
+
+# Only the (JSON-escaped) message varies between 404 responses
+_NOT_FOUND_TEMPLATE = '{"error":"not_found","message":%s}'
+_BLUEPRINT_NOT_FOUND_TEMPLATE = '{"error":"blueprint_not_found","message":%s,"blueprint_id":%s}'
+
+
 def generate_blueprint_id() -> str:
     """Generate a unique blueprint ID."""
-    return f"bp_{uuid.uuid4().hex[:12]}"
+    return f"bp_{secrets.token_hex(6)}"
 
 
-def parse_multipart_form_data(body: bytes, content_type: str) -> Tuple[Optional[bytes], Optional[str]]:
+def parse_multipart_form_data(body: bytes, content_type: str) -> Tuple[Optional[memoryview], Optional[str]]:
     """
     Parse multipart form data to extract file content and content type.
     Simple, direct boundary-based parsing.
@@ -88,100 +253,77 @@ def parse_multipart_form_data(body: bytes, content_type: str) -> Tuple[Optional[
         content_type: Content-Type header value
         
     Returns:
-        Tuple of (file_content, file_content_type) or (None, None) if parsing fails
+        Tuple of (file_content, file_content_type) or (None, None) if parsing fails;
+        file_content is a memoryview into body
     """
     try:
         # Extract boundary from content-type header
-        boundary_match = re.search(r'boundary=([^;\s]+)', content_type)
-        if not boundary_match:
-            print(f"✗ No boundary found in Content-Type: {content_type}")
+        boundary_str = content_type.partition('boundary=')[2].split(';', 1)[0].strip(' "\'')
+        if not boundary_str:
+            logger.warning("No boundary found in Content-Type: %s", content_type)
             return None, None
+        logger.debug("Boundary: %s", boundary_str)
         
-        boundary_str = boundary_match.group(1).strip('"\'')
-        print(f"Boundary: {boundary_str}")
-        
-        # Find the file part in the body
-        # Look for Content-Disposition with filename
-        file_marker = b'Content-Disposition: form-data;'
-        filename_marker = b'filename='
-        
-        # Find where the file part starts
-        file_start = body.find(file_marker)
-        if file_start == -1:
-            print(f"✗ No Content-Disposition found in body")
-            return None, None
+        # Parts are separated by --boundary; every delimiter after the first
+        # is preceded by a line break, so one find per part locates its end
+        delimiter = _BOUNDARY_PREFIX + boundary_str.encode('ascii')
         
-        # Make sure this part has a filename (it's the file upload, not another form field)
-        filename_pos = body.find(filename_marker, file_start)
-        if filename_pos == -1:
-            print(f"✗ No filename= found after Content-Disposition")
+        pos = body.find(delimiter)
+        if pos == -1:
+            logger.warning("Could not find opening boundary")
             return None, None
         
-        print(f"✓ Found file part at position {file_start}")
-        
-        # Extract content type from this part (optional, default to image/png)
-        file_content_type = 'image/png'
-        ct_start = body.find(b'Content-Type:', file_start)
-        if ct_start != -1 and ct_start < filename_pos + 200:  # Should be close to filename
-            ct_end = body.find(b'\r\n', ct_start)
-            if ct_end == -1:
-                ct_end = body.find(b'\n', ct_start)
-            if ct_end != -1:
-                file_content_type = body[ct_start + 13:ct_end].decode('utf-8', errors='replace').strip()
-                print(f"Content-Type: {file_content_type}")
-        
-        # Find the start of actual file data (after headers, marked by \r\n\r\n or \n\n)
-        data_start = body.find(b'\r\n\r\n', file_start)
-        if data_start != -1:
-            data_start += 4  # Skip the \r\n\r\n
-        else:
-            data_start = body.find(b'\n\n', file_start)
-            if data_start != -1:
-                data_start += 2  # Skip the \n\n
-            else:
-                print(f"✗ Could not find end of headers (\\r\\n\\r\\n or \\n\\n)")
+        # Some clients send bare LF line breaks; follow whichever the
+        # opening delimiter line uses
+        newline = _CRLF if body.startswith(_CRLF, pos + len(delimiter)) else _LF
+        part_delimiter = newline + delimiter
+        headers_terminator = newline + newline
+        
+        while True:
+            headers_start = pos + len(delimiter)
+            if body.startswith(_BOUNDARY_PREFIX, headers_start):
+                # Closing delimiter reached without a file part
+                logger.warning("No file part (Content-Disposition with filename=) found")
                 return None, None
-        
-        print(f"File data starts at position {data_start}")
-        
-        # Find the end of file data (next boundary)
-        # The closing boundary looks like: \r\n--boundary or \n--boundary
-        boundary_bytes = b'--' + boundary_str.encode('ascii')
-        
-        # Find next boundary after the data start
-        data_end = body.find(b'\r\n' + boundary_bytes, data_start)
-        if data_end == -1:
-            data_end = body.find(b'\n' + boundary_bytes, data_start)
-        
-        if data_end == -1:
-            # Maybe there's no newline before the boundary?
-            data_end = body.find(boundary_bytes, data_start)
+            
+            # Headers end at the first blank line of the part
+            headers_end = body.find(headers_terminator, headers_start)
+            if headers_end == -1:
+                logger.warning("Could not find end of part headers")
+                return None, None
+            data_start = headers_end + len(headers_terminator)
+            
+            data_end = body.find(part_delimiter, data_start)
             if data_end == -1:
-                print(f"✗ Could not find closing boundary")
+                logger.warning("Could not find closing boundary")
                 return None, None
+            
+            # The file upload is the part with a filename (not another form field)
+            headers = body[headers_start:headers_end]
+            if _FILENAME_PARAM in headers:
+                break
+            pos = data_end + len(newline)
         
-        # Extract the file content
-        file_content = body[data_start:data_end]
-        
-        print(f"✓ Extracted {len(file_content)} bytes")
-        print(f"  First 20 bytes (hex): {file_content[:20].hex() if len(file_content) >= 20 else file_content.hex()}")
-        
-        # Verify signature
-        if len(file_content) >= 4:
-            sig = file_content[:4].hex()
-            if sig.startswith('89504e47'):
-                print(f"  ✓ PNG signature detected")
-            elif sig.startswith('ffd8'):
-                print(f"  ✓ JPEG signature detected")
-            else:
-                print(f"  ⚠ Unexpected signature: {sig}")
+        # Extract content type from this part (optional, default to image/png)
+        file_content_type = 'image/png'
+        for header in headers.split(newline):
+            name, _, value = header.partition(b':')
+            if name.strip().lower() == _CONTENT_TYPE_HEADER:
+                file_content_type = value.decode('utf-8', errors='replace').strip()
+                break
+        
+        # Extract the file content as a view into the body (no copy)
+        file_content = memoryview(body)[data_start:data_end]
+        
+        logger.debug(
+            "Extracted %d bytes of %s from file part at position %d",
+            len(file_content), file_content_type, headers_start
+        )
         
         return file_content, file_content_type
         
     except Exception as e:
-        print(f"✗ Error parsing multipart data: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error parsing multipart data: %s", e)
         return None, None
 
 
@@ -196,13 +338,10 @@ def validate_file(file_content: bytes, content_type: str) -> Optional[str]:
     Returns:
         Error message if invalid, None if valid
     """
-    print(f"Validating file:")
-    print(f"  Content-Type: {content_type}")
-    print(f"  File size: {len(file_content)} bytes")
+    logger.debug("Validating file: Content-Type=%s, size=%d bytes", content_type, len(file_content))
     
     # Check file size (50MB limit)
-    max_size = 50 * 1024 * 1024  # 50MB
-    if len(file_content) > max_size:
+    if len(file_content) > MAX_IMAGE_BYTES:
         return f"file_too_large: File size exceeds 50MB limit. Size: {len(file_content)} bytes"
     
     # Check file type
@@ -214,41 +353,26 @@ def validate_file(file_content: bytes, content_type: str) -> Optional[str]:
     if len(file_content) < 4:
         return "invalid_file_format: File is too small to be a valid image"
     
-    # Check signatures with detailed logging
-    first_4_bytes = file_content[:4]
-    first_4_hex = first_4_bytes.hex()
-    print(f"  First 4 bytes (hex): {first_4_hex}")
-    print(f"  First 4 bytes (repr): {repr(first_4_bytes)}")
-    
-    is_png = file_content[:4] == b'\x89PNG'
-    is_jpeg = file_content[:2] == b'\xff\xd8'
-    
-    print(f"  PNG check: {is_png} (expected: 89504e47)")
-    print(f"  JPEG check: {is_jpeg} (expected: ffd8xxxx)")
+    # Check signatures from the first four bytes read as one big-endian int
+    magic = int.from_bytes(file_content[:4], 'big')
+    is_png = magic == _PNG_MAGIC
+    is_jpeg = magic >> 16 == _JPEG_MAGIC
     
     if not (is_png or is_jpeg):
-        # Try to identify what it actually is
-        if first_4_hex.startswith('ffd8'):
-            print("  ✓ Actually looks like JPEG based on hex")
-            return None  # It's actually a JPEG
-        elif first_4_hex.startswith('89504e47'):
-            print("  ✓ Actually looks like PNG based on hex")
-            return None  # It's actually a PNG
-        else:
-            return f"invalid_file_format: File does not appear to be a valid PNG or JPG image. Signature: {first_4_hex}"
+        return f"invalid_file_format: File does not appear to be a valid PNG or JPG image. Signature: {magic:08x}"
     
-    print("  ✓ File validation passed")
+    logger.debug("File validation passed (%s)", 'PNG' if is_png else 'JPEG')
     return None
 
 
-def upload_to_s3(bucket: str, blueprint_id: str, file_content: bytes, content_type: str) -> str:
+def upload_to_s3(bucket: str, blueprint_id: str, file_content, content_type: str) -> str:
     """
     Upload file to S3.
     
     Args:
         bucket: S3 bucket name
         blueprint_id: Unique blueprint identifier
-        file_content: File content bytes
+        file_content: File content bytes or memoryview
         content_type: MIME type
         
     Returns:
@@ -256,23 +380,57 @@ def upload_to_s3(bucket: str, blueprint_id: str, file_content: bytes, content_ty
     """
     # Determine file extension from content type
     extension = 'png' if content_type == 'image/png' else 'jpg'
-    s3_key = f"uploads/{blueprint_id}/blueprint.{extension}"
+    # Random hex from the ID follows the upload prefix so keys spread across
+    # S3 partitions instead of all sharing one (and its request-rate ceiling)
+    s3_key = f"{UPLOAD_PREFIX}{blueprint_id[3:5]}/{blueprint_id}/blueprint.{extension}"
     
     try:
-        s3_client.put_object(
-            Bucket=bucket,
-            Key=s3_key,
-            Body=file_content,
-            ContentType=content_type,
-            Metadata={
-                'blueprint-id': blueprint_id
-            }
-        )
+        if len(file_content) <= MULTIPART_UPLOAD_THRESHOLD:
+            # Small files: a single PUT is cheapest
+            _c('s3').put_object(
+                Bucket=bucket,
+                Key=s3_key,
+                Body=_BufferReader(file_content),
+                ContentType=content_type,
+                Metadata={
+                    'blueprint-id': blueprint_id
+                }
+            )
+        else:
+            _c('s3').upload_fileobj(
+                _BufferReader(file_content),
+                bucket,
+                s3_key,
+                ExtraArgs={
+                    'ContentType': content_type,
+                    'Metadata': {
+                        'blueprint-id': blueprint_id
+                    }
+                },
+                Config=S3_UPLOAD_CONFIG
+            )
         return s3_key
-    except ClientError as e:
+    except (ClientError, S3UploadFailedError) as e:
         raise LambdaError(f"Failed to upload file to S3: {str(e)}")
 
 
+def get_s3_object_size(bucket: str, key: str) -> int:
+    """
+    Get the size of an S3 object without downloading it.
+    
+    Args:
+        bucket: S3 bucket name
+        key: S3 object key
+        
+    Returns:
+        Object size in bytes
+    """
+    try:
+        return _c('s3').head_object(Bucket=bucket, Key=key)['ContentLength']
+    except ClientError as e:
+        raise LambdaError(f"Failed to read image metadata from S3: {str(e)}")
+
+
 def download_image_from_s3(bucket: str, key: str) -> bytes:
     """
     Download image from S3 bucket.
@@ -285,57 +443,82 @@ def download_image_from_s3(bucket: str, key: str) -> bytes:
         Image bytes
     """
     try:
-        response = s3_client.get_object(Bucket=bucket, Key=key)
-        return response['Body'].read()
+        return _c('s3').get_object(Bucket=bucket, Key=key)['Body'].read()
     except ClientError as e:
         raise LambdaError(f"Failed to download image from S3: {str(e)}")
 
 
-def invoke_sagemaker_endpoint(image_bytes: bytes) -> Dict[str, Any]:
+def invoke_sagemaker_endpoint(image_bytes: bytes, content_type: str = 'image/png') -> Dict[str, Any]:
     """
-    Invoke SageMaker endpoint with preprocessed image.
+    Invoke SageMaker endpoint with an encoded image.
+    
+    The encoded image is sent as the raw request body (no base64/JSON
+    wrapping); the inference container decodes image/* bodies directly.
     
     Args:
-        image_bytes: Preprocessed image bytes
+        image_bytes: Original or preprocessed image bytes
+        content_type: MIME type of image_bytes
         
     Returns:
         SageMaker endpoint response as dictionary
     """
     try:
-        # Encode image as base64 for JSON payload
-        image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-        payload = json.dumps({'image': image_base64})
-        
-        # Invoke endpoint
-        response = sagemaker_runtime.invoke_endpoint(
-            EndpointName=SAGEMAKER_ENDPOINT_NAME,
-            ContentType='application/json',
-            Accept='application/json',
-            Body=payload
-        )
+        # Invoke endpoint (signed request, no boto3 client to build)
+        response_bytes = invoke_endpoint(SAGEMAKER_ENDPOINT_NAME, image_bytes, content_type)
         
         # Parse response with error handling for encoding issues
-        response_bytes = response['Body'].read()
         try:
             response_body = response_bytes.decode('utf-8')
         except UnicodeDecodeError:
             # Fallback to latin-1 if UTF-8 fails (shouldn't happen with JSON, but be safe)
             response_body = response_bytes.decode('latin-1', errors='replace')
         
+        if HAS_ORJSON:
+            return orjson.loads(response_body)
         return json.loads(response_body)
         
-    except ClientError as e:
+    except AwsRequestError as e:
         raise LambdaError(f"Failed to invoke SageMaker endpoint: {str(e)}")
     except json.JSONDecodeError as e:
         raise LambdaError(f"Failed to parse SageMaker response: {str(e)}")
 
 
-def process_image(image_bytes: bytes, blueprint_id: str) -> Dict[str, Any]:
+def _raw_image_for_endpoint(image_bytes) -> Optional[Tuple[bytes, str]]:
+    """
+    Get an image as-is for the endpoint when it can skip client-side resizing.
+    
+    Args:
+        image_bytes: Raw image bytes or a BytesIO stream
+        
+    Returns:
+        Tuple of (image bytes, content type), or None if the image has to be
+        resized in Lambda first
+    """
+    if CLIENT_SIDE_RESIZE:
+        return None
+    
+    if isinstance(image_bytes, io.BytesIO):
+        image_bytes = image_bytes.getvalue()
+    elif not isinstance(image_bytes, (bytes, bytearray)):
+        return None
+    
+    if len(image_bytes) > SAGEMAKER_MAX_RAW_BYTES or len(image_bytes) < 4:
+        return None
+    
+    magic = int.from_bytes(image_bytes[:4], 'big')
+    if magic == _PNG_MAGIC:
+        return image_bytes, 'image/png'
+    if magic >> 16 == _JPEG_MAGIC:
+        return image_bytes, 'image/jpeg'
+    return None
+
+
+def process_image(image_bytes, blueprint_id: str) -> Dict[str, Any]:
     """
     Main image processing pipeline.
     
     Args:
-        image_bytes: Raw image bytes
+        image_bytes: Raw image bytes or a binary stream (e.g. S3 StreamingBody)
         blueprint_id: Unique identifier for the blueprint
         
     Returns:
@@ -344,29 +527,48 @@ def process_image(image_bytes: bytes, blueprint_id: str) -> Dict[str, Any]:
     start_time = time.time()
     
     try:
-        # Get original image dimensions
-        original_width, original_height = get_image_dimensions(image_bytes)
-        
-        # Preprocess image (resize to 640x640)
-        preprocessed_image = preprocess_image(image_bytes, target_size=(640, 640))
-        
-        # Convert PIL Image to bytes for SageMaker
-        from PIL import Image
-        import io
-        img_byte_arr = io.BytesIO()
-        preprocessed_image.save(img_byte_arr, format='PNG')
-        preprocessed_bytes = img_byte_arr.getvalue()
+        raw_image = _raw_image_for_endpoint(image_bytes)
         
-        # Invoke SageMaker endpoint for real inference
-        sagemaker_response = invoke_sagemaker_endpoint(preprocessed_bytes)
-        detected_rooms = sagemaker_response.get('detected_rooms', [])
-        processing_time_ms = sagemaker_response.get('processing_time_ms', 0)
+        if raw_image is not None:
+            # The container resizes, and its 0-1000 coordinates are already
+            # relative to the original image
+            sagemaker_response = invoke_sagemaker_endpoint(raw_image[0], content_type=raw_image[1])
+            detected_rooms = sagemaker_response.get('detected_rooms', [])
+        else:
+            # Read original dimensions and preprocess (resize to 640x640) from a single open
+            preprocessed_image, (original_width, original_height) = load_and_preprocess(
+                image_bytes, target_size=SAGEMAKER_INPUT_SIZE
+            )
+            
+            # Convert PIL Image to bytes for SageMaker
+            _IMG_BUF.seek(0)
+            _IMG_BUF.truncate()
+            preprocessed_image.save(_IMG_BUF, format='JPEG', quality=SAGEMAKER_JPEG_QUALITY)
+            preprocessed_bytes = _IMG_BUF.getvalue()
+            
+            # Invoke SageMaker endpoint for real inference
+            sagemaker_response = invoke_sagemaker_endpoint(preprocessed_bytes, content_type='image/jpeg')
+            detected_rooms = sagemaker_response.get('detected_rooms', [])
+            
+            # Coordinates are 0-1000 of the padded 640x640 frame; map them
+            # back through the letterbox to the original image
+            if detected_rooms:
+                input_width, input_height = SAGEMAKER_INPUT_SIZE
+                boxes = [room['bounding_box'] for room in detected_rooms]
+                boxes = transform_bounding_boxes(
+                    [[x_min * input_width / 1000, y_min * input_height / 1000,
+                      x_max * input_width / 1000, y_max * input_height / 1000]
+                     for x_min, y_min, x_max, y_max in boxes],
+                    original_width, original_height, input_width, input_height
+                ).tolist()
+                for room, box in zip(detected_rooms, boxes):
+                    room['bounding_box'] = box
         
         # Calculate total processing time
         total_time_ms = int((time.time() - start_time) * 1000)
         
         # Update status to completed
-        status_manager.mark_completed(
+        get_status_manager().mark_completed(
             blueprint_id=blueprint_id,
             processing_time_ms=total_time_ms,
             detected_rooms=detected_rooms,
@@ -386,7 +588,7 @@ def process_image(image_bytes: bytes, blueprint_id: str) -> Dict[str, Any]:
     except Exception as e:
         # Update status to failed
         try:
-            status_manager.mark_failed(
+            get_status_manager().mark_failed(
                 blueprint_id=blueprint_id,
                 error='processing_error',
                 message=str(e)
@@ -399,23 +601,21 @@ def process_image(image_bytes: bytes, blueprint_id: str) -> Dict[str, Any]:
 
 def decimal_to_float(obj):
     """Convert Decimal objects to float for JSON serialization."""
-    from decimal import Decimal
     if isinstance(obj, Decimal):
         return float(obj)
     raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
 
 
 def add_cors_headers(headers: Dict[str, str] = None) -> Dict[str, str]:
-    """Add CORS headers to response."""
-    cors_headers = {
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key',
-        'Access-Control-Allow-Methods': 'GET,POST,OPTIONS',
-        'Content-Type': 'application/json'
-    }
+    """
+    Add CORS headers to response.
+    
+    Without extra headers the shared module-level dict is returned, so
+    callers must not modify it.
+    """
     if headers:
-        cors_headers.update(headers)
-    return cors_headers
+        return {**_CORS, **headers}
+    return _CORS
 
 
 def is_api_gateway_event(event: Dict[str, Any]) -> bool:
@@ -438,98 +638,96 @@ def handle_upload(event: Dict[str, Any]) -> Dict[str, Any]:
         body = event.get('body', '')
         is_base64 = event.get('isBase64Encoded', False)
         
-        print(f"Upload request received")
-        print(f"  isBase64Encoded: {is_base64}")
-        print(f"  body type: {type(body)}")
-        print(f"  body length: {len(body) if isinstance(body, (str, bytes)) else 'N/A'}")
-        
         # Get content type first (needed for debugging)
         headers = event.get('headers', {}) or {}
         content_type = headers.get('Content-Type') or headers.get('content-type', '')
-        print(f"  Content-Type: {content_type}")
+        logger.debug(
+            "Upload request received: isBase64Encoded=%s, body type=%s, Content-Type=%s",
+            is_base64, type(body).__name__, content_type
+        )
+        
+        # Reject oversize uploads before paying for the decode and allocation
+        body_size = (len(body) * 3) // 4 if is_base64 and body else len(body or b'')
+        content_length = headers.get('Content-Length') or headers.get('content-length')
+        if content_length and content_length.isdigit():
+            body_size = max(body_size, int(content_length))
+        if body_size > MAX_UPLOAD_BODY_BYTES:
+            logger.warning("Rejected oversize upload: %d bytes", body_size)
+            return {
+                'statusCode': 413,
+                'headers': add_cors_headers(),
+                'body': _dumps({
+                    'error': 'file_too_large',
+                    'message': f'File size exceeds 50MB limit. Size: {body_size} bytes'
+                })
+            }
         
-        # API Gateway passes multipart data - handle both base64 and raw string cases
+        # API Gateway base64-encodes binary media types and says so in
+        # isBase64Encoded, so the body is decoded exactly once. a2b_base64
+        # reads an ASCII str in place, where base64.b64decode first copies
+        # it to bytes.
         if is_base64:
             try:
-                body_bytes = base64.b64decode(body)
-                print(f"✓ Decoded base64 body: {len(body_bytes)} bytes")
+                body_bytes = binascii.a2b_base64(body)
             except Exception as e:
-                print(f"✗ Failed to decode base64: {e}")
+                logger.warning("Failed to decode base64 body: %s", e)
                 return {
                     'statusCode': 400,
                     'headers': add_cors_headers(),
-                    'body': json.dumps({
+                    'body': _dumps({
                         'error': 'invalid_request',
                         'message': f'Failed to decode base64 body: {str(e)}'
                     })
                 }
         elif isinstance(body, str):
-            # Try base64 decode first (API Gateway might not set isBase64Encoded correctly)
-            try:
-                decoded = base64.b64decode(body, validate=True)
-                # Check if decoded data looks like multipart or image
-                if b'Content-Disposition' in decoded or b'boundary' in decoded.lower():
-                    body_bytes = decoded
-                    print(f"✓ Detected base64-encoded multipart data: {len(body_bytes)} bytes")
-                elif len(decoded) > 4 and (decoded[:4] == b'\x89PNG' or decoded[:2] == b'\xff\xd8'):
-                    body_bytes = decoded
-                    print(f"✓ Detected base64-encoded image: {len(body_bytes)} bytes")
-                else:
-                    # Not base64, encode as bytes using latin-1 to preserve byte values
-                    body_bytes = body.encode('latin-1', errors='replace')
-                    print(f"Using latin-1 encoding for body string: {len(body_bytes)} bytes")
-            except Exception as decode_err:
-                # Not base64, encode as bytes using latin-1 to preserve all byte values
-                # latin-1 is a 1:1 mapping that won't corrupt binary data like UTF-8 does
-                print(f"Base64 decode failed ({decode_err}), using latin-1 encoding")
-                body_bytes = body.encode('latin-1', errors='replace')
-                print(f"Using latin-1 encoding (not base64): {len(body_bytes)} bytes")
+            # API Gateway base64-encodes binary media types (multipart/form-data
+            # is configured as one), so a plain string body means the binary
+            # data was already mangled as text
+            logger.warning("Received non-base64 string body: %d characters", len(body))
+            return {
+                'statusCode': 400,
+                'headers': add_cors_headers(),
+                'body': _NOT_BASE64_BODY
+            }
         else:
             body_bytes = body
-            print(f"Body is already bytes: {len(body_bytes)} bytes")
         
         # Validate we have data
         if not body_bytes or len(body_bytes) == 0:
             return {
                 'statusCode': 400,
                 'headers': add_cors_headers(),
-                'body': json.dumps({
-                    'error': 'invalid_request',
-                    'message': 'Request body is empty'
-                })
+                'body': _EMPTY_BODY
             }
         
-        # Debug: Show first 200 bytes of body
-        preview = body_bytes[:200] if len(body_bytes) > 200 else body_bytes
-        print(f"Body preview (first {len(preview)} bytes):")
-        print(f"  Hex: {preview.hex()[:100]}...")
-        print(f"  Text (safe): {preview[:100].decode('utf-8', errors='replace')}")
+        # Debug: Show the start of the body (only built when debug logging is on)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Body (%d bytes) preview: %s",
+                len(body_bytes), body_bytes[:100].decode('utf-8', errors='replace')
+            )
         
         # Check if content type indicates multipart
         if not content_type or 'multipart' not in content_type.lower():
             return {
                 'statusCode': 400,
                 'headers': add_cors_headers(),
-                'body': json.dumps({
+                'body': _dumps({
                     'error': 'invalid_request',
                     'message': f'Expected multipart/form-data, got: {content_type}'
                 })
             }
         
         # Parse multipart form data
-        print("Parsing multipart form data...")
         file_content, file_content_type = parse_multipart_form_data(body_bytes, content_type)
         
         if not file_content:
-            print("✗ Failed to extract file from multipart data")
+            logger.warning("Failed to extract file from multipart data")
             # Return helpful error message
             return {
                 'statusCode': 400,
                 'headers': add_cors_headers(),
-                'body': json.dumps({
-                    'error': 'invalid_request',
-                    'message': 'No file found in multipart request. Please ensure you are sending a file with the field name "file".'
-                })
+                'body': _NO_FILE_BODY
             }
         
         # Validate file
@@ -540,7 +738,7 @@ def handle_upload(event: Dict[str, Any]) -> Dict[str, Any]:
             return {
                 'statusCode': status_code,
                 'headers': add_cors_headers(),
-                'body': json.dumps({
+                'body': _dumps({
                     'error': error_code.strip(),
                     'message': error_message.strip()
                 })
@@ -549,41 +747,32 @@ def handle_upload(event: Dict[str, Any]) -> Dict[str, Any]:
         # Generate blueprint ID
         blueprint_id = generate_blueprint_id()
         
-        # Upload to S3
-        s3_key = upload_to_s3(S3_BUCKET, blueprint_id, file_content, file_content_type)
+        # Create initial status entry while the file uploads to S3
+        status_future = _IO_POOL.submit(
+            get_status_manager().create_status,
+            blueprint_id=blueprint_id,
+            message='Blueprint uploaded successfully. Processing started.'
+        )
         
-        # Create initial status entry
         try:
-            status_manager.create_status(
-                blueprint_id=blueprint_id,
-                status='processing',
-                message='Blueprint uploaded successfully. Processing started.'
-            )
-        except:
-            pass  # Continue even if status creation fails
-        
-        # Trigger async processing by invoking this same Lambda function
-        processing_payload = {
-            'blueprint_id': blueprint_id,
-            's3_bucket': S3_BUCKET,
-            's3_key': s3_key
-        }
+            upload_to_s3(S3_BUCKET, blueprint_id, file_content, file_content_type)
+        finally:
+            # Collect the status write before returning so a failure is logged
+            # rather than lost with the future. This does not order it against
+            # processing; create_status's condition keeps it from overwriting
+            try:
+                status_future.result()
+            except Exception as e:
+                # Continue even if status creation fails
+                logger.warning("Could not create initial status for %s: %s", blueprint_id, e)
         
-        try:
-            lambda_client.invoke(
-                FunctionName=PROCESSING_LAMBDA_NAME,
-                InvocationType='Event',  # Async invocation
-                Payload=json.dumps(processing_payload)
-            )
-        except Exception as e:
-            print(f"Warning: Failed to trigger async processing: {e}")
-            # Don't fail the upload if async trigger fails
+        # Processing is started by the bucket's ObjectCreated notification on this PUT
         
         # Return success response
         return {
             'statusCode': 200,
             'headers': add_cors_headers(),
-            'body': json.dumps({
+            'body': _dumps({
                 'blueprint_id': blueprint_id,
                 'status': 'processing',
                 'message': 'Blueprint uploaded successfully. Processing started.'
@@ -591,11 +780,11 @@ def handle_upload(event: Dict[str, Any]) -> Dict[str, Any]:
         }
         
     except Exception as e:
-        print(f"Upload error: {e}")
+        logger.error("Upload error: %s", e)
         return {
             'statusCode': 500,
             'headers': add_cors_headers(),
-            'body': json.dumps({
+            'body': _dumps({
                 'error': 'internal_error',
                 'message': f'An unexpected error occurred: {str(e)}'
             })
@@ -621,24 +810,21 @@ def handle_status(event: Dict[str, Any]) -> Dict[str, Any]:
             return {
                 'statusCode': 400,
                 'headers': add_cors_headers(),
-                'body': json.dumps({
-                    'error': 'missing_blueprint_id',
-                    'message': 'blueprint_id is required in path'
-                })
+                'body': _MISSING_PATH_BLUEPRINT_ID_BODY
             }
         
-        # Get status from DynamoDB
-        status_data = status_manager.get_status(blueprint_id)
+        # Get status from DynamoDB in a single read. Only completed records
+        # carry detected_rooms, and only the completed response returns them
+        status_data = get_status_manager().get_status(blueprint_id)
         
         if not status_data:
             return {
                 'statusCode': 404,
                 'headers': add_cors_headers(),
-                'body': json.dumps({
-                    'error': 'blueprint_not_found',
-                    'message': f'Blueprint with ID {blueprint_id} not found',
-                    'blueprint_id': blueprint_id
-                })
+                'body': _BLUEPRINT_NOT_FOUND_TEMPLATE % (
+                    _dumps(f'Blueprint with ID {blueprint_id} not found'),
+                    _dumps(blueprint_id)
+                )
             }
         
         # Format response based on status
@@ -668,15 +854,15 @@ def handle_status(event: Dict[str, Any]) -> Dict[str, Any]:
         return {
             'statusCode': 200,
             'headers': add_cors_headers(),
-            'body': json.dumps(response_body, default=decimal_to_float)
+            'body': _dumps(response_body, default=decimal_to_float)
         }
         
     except Exception as e:
-        print(f"Status error: {e}")
+        logger.error("Status error: %s", e)
         return {
             'statusCode': 500,
             'headers': add_cors_headers(),
-            'body': json.dumps({
+            'body': _dumps({
                 'error': 'internal_error',
                 'message': f'An unexpected error occurred: {str(e)}'
             })
@@ -704,19 +890,14 @@ def handle_processing(event: Dict[str, Any]) -> Dict[str, Any]:
             return {
                 'statusCode': 400,
                 'headers': add_cors_headers(),
-                'body': json.dumps({
-                    'blueprint_id': blueprint_id or 'unknown',
-                    'status': 'failed',
-                    'error': 'missing_blueprint_id',
-                    'message': 'blueprint_id is required'
-                })
+                'body': _MISSING_BLUEPRINT_ID_BODY
             }
         
         if not s3_key:
             return {
                 'statusCode': 400,
                 'headers': add_cors_headers(),
-                'body': json.dumps({
+                'body': _dumps({
                     'blueprint_id': blueprint_id,
                     'status': 'failed',
                     'error': 'missing_s3_key',
@@ -724,29 +905,40 @@ def handle_processing(event: Dict[str, Any]) -> Dict[str, Any]:
                 })
             }
         
-        # Update status to processing
+        # Check the image exists and is within the size limit before any
+        # status write, download or decode
+        image_size = get_s3_object_size(s3_bucket, s3_key)
+        if image_size > MAX_IMAGE_BYTES:
+            message = f'Image size exceeds 50MB limit. Size: {image_size} bytes'
+            try:
+                get_status_manager().mark_failed(blueprint_id, 'file_too_large', message)
+            except:
+                pass  # Still reject the image if the status update fails
+            return {
+                'statusCode': 413,
+                'headers': add_cors_headers(),
+                'body': _dumps({
+                    'blueprint_id': blueprint_id,
+                    'status': 'failed',
+                    'error': 'file_too_large',
+                    'message': message
+                })
+            }
+        
+        # Update status to processing (one write; clients rarely poll fast
+        # enough to see separate download/inference stages)
         try:
-            status_manager.update_status(
+            get_status_manager().update_status(
                 blueprint_id=blueprint_id,
                 status='processing',
-                message='Downloading image from S3...'
+                message='Running inference...'
             )
         except:
             pass  # Continue even if status update fails
         
-        # Download image from S3
+        # Download image from S3; process_image decodes the bytes exactly once
         image_bytes = download_image_from_s3(s3_bucket, s3_key)
         
-        # Update status
-        try:
-            status_manager.update_status(
-                blueprint_id=blueprint_id,
-                status='processing',
-                message='Processing image with SageMaker...'
-            )
-        except:
-            pass
-        
         # Process image
         result = process_image(image_bytes, blueprint_id)
         
@@ -754,7 +946,7 @@ def handle_processing(event: Dict[str, Any]) -> Dict[str, Any]:
         return {
             'statusCode': 200,
             'headers': add_cors_headers(),
-            'body': json.dumps(result, default=decimal_to_float)
+            'body': _dumps(result, default=decimal_to_float)
         }
         
     except LambdaError as e:
@@ -763,7 +955,7 @@ def handle_processing(event: Dict[str, Any]) -> Dict[str, Any]:
         return {
             'statusCode': 500,
             'headers': add_cors_headers(),
-            'body': json.dumps({
+            'body': _dumps({
                 'blueprint_id': blueprint_id,
                 'status': 'failed',
                 'error': 'processing_error',
@@ -777,7 +969,7 @@ def handle_processing(event: Dict[str, Any]) -> Dict[str, Any]:
         return {
             'statusCode': 500,
             'headers': add_cors_headers(),
-            'body': json.dumps({
+            'body': _dumps({
                 'blueprint_id': blueprint_id,
                 'status': 'failed',
                 'error': 'internal_error',
@@ -786,6 +978,55 @@ def handle_processing(event: Dict[str, Any]) -> Dict[str, Any]:
         }
 
 
+def is_s3_event(event: Dict[str, Any]) -> bool:
+    """Check if event is an S3 ObjectCreated notification."""
+    records = event.get('Records')
+    return bool(records) and records[0].get('eventSource') == 'aws:s3'
+
+
+def handle_s3_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Handle S3 ObjectCreated notifications for uploaded blueprints.
+    
+    Each record is converted into a processing event. Keys have the form
+    "uploads/<xx>/<blueprint_id>/blueprint.<ext>", so the blueprint ID is the
+    second-to-last path segment. Objects whose key has no blueprint ID there
+    are skipped, so nothing else written to the bucket creates a status row.
+    
+    Args:
+        event: S3 notification event
+        
+    Returns:
+        Processing result of the last processed record, or None if every
+        record was skipped
+    """
+    result = None
+    for record in event['Records']:
+        s3_info = record['s3']
+        # Object keys in notifications are URL-encoded
+        s3_key = unquote_plus(s3_info['object']['key'])
+        parts = s3_key.split('/')
+        blueprint_id = parts[-2] if len(parts) >= 2 else ''
+        if not blueprint_id.startswith('bp_'):
+            logger.warning("Skipping S3 object that is not a blueprint upload: %s", s3_key)
+            continue
+        result = handle_processing({
+            'blueprint_id': blueprint_id,
+            's3_bucket': s3_info['bucket']['name'],
+            's3_key': s3_key
+        })
+    return result
+
+
+# API Gateway routes keyed on (HTTP method, last path segment):
+#   POST /api/v1/blueprints/upload
+#   GET  /api/v1/blueprints/{blueprint_id}/status
+_ROUTES = {
+    ('POST', 'upload'): handle_upload,
+    ('GET', 'status'): handle_status,
+}
+
+
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     AWS Lambda handler function.
@@ -793,11 +1034,12 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     Handles both:
     1. API Gateway upload events (POST /api/v1/blueprints/upload)
     2. API Gateway status events (GET /api/v1/blueprints/{id}/status)
-    3. Direct Lambda invocation for processing:
+    3. S3 ObjectCreated notifications for uploaded blueprints
+    4. Direct Lambda invocation for processing:
        {
            "blueprint_id": "bp_abc123",
            "s3_bucket": "room-detection-ai-blueprints-dev",
-           "s3_key": "uploads/bp_abc123/image.png"
+           "s3_key": "uploads/ab/bp_abc123/blueprint.png"
        }
     
     Returns:
@@ -817,24 +1059,30 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         http_method = event.get('httpMethod', '')
         path = event.get('path', '')
         
-        # Handle upload endpoint: POST /api/v1/blueprints/upload
-        if http_method == 'POST' and '/upload' in path:
-            return handle_upload(event)
-        
-        # Handle status endpoint: GET /api/v1/blueprints/{blueprint_id}/status
-        if http_method == 'GET' and '/status' in path:
-            return handle_status(event)
+        route_handler = _ROUTES.get((http_method, path.rstrip('/').rpartition('/')[2]))
+        if route_handler is not None:
+            return route_handler(event)
         
         # Unknown API Gateway route
         return {
             'statusCode': 404,
             'headers': add_cors_headers(),
-            'body': json.dumps({
-                'error': 'not_found',
-                'message': f'No handler for {http_method} {path}'
-            })
+            'body': _NOT_FOUND_TEMPLATE % _dumps(f'No handler for {http_method} {path}')
         }
     
+    # Upload notification from S3
+    if is_s3_event(event):
+        return handle_s3_event(event)
+    
     # Direct invocation for image processing
     return handle_processing(event)
 
+
+# Lambda runs INIT with unthrottled CPU, so load Pillow and the image utils
+# there instead of on the first processing request. Binding the lazy
+# loader's global means load_and_preprocess skips its import check.
+if EAGER_IMPORTS:
+    from utils.image_processor import load_and_preprocess as _load_and_preprocess
+    # Pillow imports its PNG/JPEG format plugins on the first open or save
+    from PIL import Image
+    Image.preinit()
@@ -4,14 +4,20 @@ Unit tests for Lambda function handler.
 
 import json
 import base64
+import datetime
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 from PIL import Image
 import io
 
-from handler import lambda_handler, process_image, invoke_sagemaker_endpoint, download_image_from_s3
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.credentials import Credentials
+
+from handler import lambda_handler, process_image, parse_multipart_form_data, invoke_sagemaker_endpoint, download_image_from_s3, MAX_IMAGE_BYTES
 from utils.image_processor import resize_image, normalize_image, preprocess_image, get_image_dimensions
-from utils.coordinate_transformer import transform_coordinates_to_normalized, transform_bounding_box
+from utils import aws_min
+from utils.coordinate_transformer import transform_coordinates_to_normalized, transform_bounding_box, transform_bounding_boxes
 
 
 def create_test_image(width=800, height=600):
@@ -66,6 +72,14 @@ class TestImageProcessor:
         
         assert width == 800
         assert height == 600
+    
+    def test_get_image_dimensions_jpeg(self):
+        """Test reading JPEG dimensions from the frame header."""
+        image = create_test_image(800, 600)
+        img_byte_arr = io.BytesIO()
+        image.save(img_byte_arr, format='JPEG', progressive=True)
+        
+        assert get_image_dimensions(img_byte_arr.getvalue()) == (800, 600)
 
 
 class TestCoordinateTransformer:
@@ -98,23 +112,35 @@ class TestCoordinateTransformer:
         
         assert len(transformed) == 4
         assert all(0 <= coord <= 1000 for coord in transformed)
+    
+    def test_transform_bounding_boxes_matches_scalar(self):
+        """Test vectorized transform matches the per-box transform."""
+        boxes = [[50, 50, 200, 200], [0, 80, 640, 560], [-10, 700, 30.5, 90.25]]
+        
+        transformed = transform_bounding_boxes(boxes, 800, 600)
+        
+        assert transformed.tolist() == [
+            transform_bounding_box(box, 800, 600) for box in boxes
+        ]
 
 
 class TestLambdaHandler:
     """Test Lambda handler function."""
     
-    @patch('handler.s3_client')
-    @patch('handler.sagemaker_runtime')
-    def test_lambda_handler_success(self, mock_sagemaker, mock_s3):
+    @patch('handler.get_status_manager')
+    @patch('handler._c')
+    @patch('handler.invoke_endpoint')
+    def test_lambda_handler_success(self, mock_invoke_endpoint, mock_c, mock_get_status_manager):
         """Test successful Lambda invocation."""
         # Setup mocks
         test_image = create_test_image(800, 600)
         image_bytes = image_to_bytes(test_image)
         
-        mock_s3.get_object.return_value = {'Body': Mock(read=lambda: image_bytes)}
+        mock_s3 = mock_c.return_value
+        mock_s3.head_object.return_value = {'ContentLength': len(image_bytes)}
+        mock_s3.get_object.return_value = {'Body': io.BytesIO(image_bytes)}
         
-        mock_sagemaker_response = Mock()
-        mock_sagemaker_response.read.return_value.decode.return_value = json.dumps({
+        mock_invoke_endpoint.return_value = json.dumps({
             'status': 'success',
             'processing_time_ms': 1500,
             'detected_rooms': [
@@ -124,8 +150,7 @@ class TestLambdaHandler:
                     'confidence': 0.95
                 }
             ]
-        })
-        mock_sagemaker.invoke_endpoint.return_value = {'Body': mock_sagemaker_response}
+        }).encode('utf-8')
         
         # Test event
         event = {
@@ -143,6 +168,59 @@ class TestLambdaHandler:
         assert body['status'] == 'completed'
         assert body['blueprint_id'] == 'bp_test123'
         assert 'detected_rooms' in body
+        # Small PNGs are sent as-is; the endpoint does its own resizing
+        mock_invoke_endpoint.assert_called_once()
+        assert mock_invoke_endpoint.call_args.args[1:] == (image_bytes, 'image/png')
+    
+    @patch('handler.CLIENT_SIDE_RESIZE', True)
+    @patch('handler.get_status_manager')
+    @patch('handler._c')
+    @patch('handler.invoke_endpoint')
+    def test_lambda_handler_client_side_resize(self, mock_invoke_endpoint, mock_c, mock_get_status_manager):
+        """Test boxes from a letterboxed input are mapped back to the original image."""
+        image_bytes = image_to_bytes(create_test_image(800, 600))
+        mock_s3 = mock_c.return_value
+        mock_s3.head_object.return_value = {'ContentLength': len(image_bytes)}
+        mock_s3.get_object.return_value = {'Body': io.BytesIO(image_bytes)}
+        # 800x600 is letterboxed to 640x480 with 80px bands above and below
+        mock_invoke_endpoint.return_value = json.dumps({
+            'detected_rooms': [{'id': 'room_001', 'bounding_box': [0, 125, 1000, 875]}]
+        }).encode('utf-8')
+        
+        event = {
+            'blueprint_id': 'bp_test123',
+            's3_bucket': 'test-bucket',
+            's3_key': 'test/image.png'
+        }
+        
+        response = lambda_handler(event, None)
+        
+        assert mock_invoke_endpoint.call_args.args[2] == 'image/jpeg'
+        body = json.loads(response['body'])
+        assert body['detected_rooms'][0]['bounding_box'] == [0, 0, 1000, 1000]
+    
+    @patch('handler.get_status_manager')
+    @patch('handler._c')
+    @patch('handler.invoke_endpoint')
+    def test_lambda_handler_image_too_large(self, mock_invoke_endpoint, mock_c, mock_get_status_manager):
+        """Test oversized images are rejected before download."""
+        mock_s3 = mock_c.return_value
+        mock_s3.head_object.return_value = {'ContentLength': MAX_IMAGE_BYTES + 1}
+        
+        event = {
+            'blueprint_id': 'bp_test123',
+            's3_bucket': 'test-bucket',
+            's3_key': 'test/image.png'
+        }
+        
+        response = lambda_handler(event, None)
+        
+        assert response['statusCode'] == 413
+        body = json.loads(response['body'])
+        assert body['error'] == 'file_too_large'
+        mock_s3.get_object.assert_not_called()
+        mock_invoke_endpoint.assert_not_called()
+        mock_get_status_manager.return_value.mark_failed.assert_called_once()
     
     def test_lambda_handler_missing_blueprint_id(self):
         """Test Lambda handler with missing blueprint_id."""
@@ -171,6 +249,244 @@ class TestLambdaHandler:
         body = json.loads(response['body'])
         assert body['status'] == 'failed'
         assert 'missing_s3_key' in body['error']
+    
+    @patch('handler.handle_processing')
+    def test_lambda_handler_s3_event(self, mock_processing):
+        """Test S3 upload notifications are routed to processing."""
+        mock_processing.return_value = {'statusCode': 200}
+        event = {
+            'Records': [{
+                'eventSource': 'aws:s3',
+                's3': {
+                    'bucket': {'name': 'test-bucket'},
+                    'object': {'key': 'uploads/ab/bp_ab1234567890/blueprint.png'}
+                }
+            }]
+        }
+        
+        response = lambda_handler(event, None)
+        
+        assert response['statusCode'] == 200
+        mock_processing.assert_called_once_with({
+            'blueprint_id': 'bp_ab1234567890',
+            's3_bucket': 'test-bucket',
+            's3_key': 'uploads/ab/bp_ab1234567890/blueprint.png'
+        })
+    
+    @patch('handler.handle_processing')
+    def test_lambda_handler_s3_event_skips_other_keys(self, mock_processing):
+        """Test images outside blueprint uploads are not processed."""
+        event = {
+            'Records': [{
+                'eventSource': 'aws:s3',
+                's3': {
+                    'bucket': {'name': 'test-bucket'},
+                    'object': {'key': 'training/images/1034_F1_original.png'}
+                }
+            }]
+        }
+        
+        assert lambda_handler(event, None) is None
+        mock_processing.assert_not_called()
+    
+    @patch('handler.get_status_manager')
+    @patch('handler._c')
+    def test_lambda_handler_upload(self, mock_c, mock_get_status_manager):
+        """Test upload stores the file and creates the initial status."""
+        image_bytes = image_to_bytes(create_test_image(10, 10))
+        boundary = 'testboundary'
+        body = (
+            f'--{boundary}\r\n'
+            'Content-Disposition: form-data; name="file"; filename="plan.png"\r\n'
+            'Content-Type: image/png\r\n\r\n'
+        ).encode() + image_bytes + f'\r\n--{boundary}--\r\n'.encode()
+        
+        event = {
+            'httpMethod': 'POST',
+            'path': '/api/v1/blueprints/upload',
+            'headers': {'Content-Type': f'multipart/form-data; boundary={boundary}'},
+            'body': base64.b64encode(body).decode('ascii'),
+            'isBase64Encoded': True
+        }
+        
+        response = lambda_handler(event, None)
+        
+        assert response['statusCode'] == 200
+        blueprint_id = json.loads(response['body'])['blueprint_id']
+        put_kwargs = mock_c.return_value.put_object.call_args.kwargs
+        assert put_kwargs['Body'].read() == image_bytes
+        assert put_kwargs['Key'] == f'uploads/{blueprint_id[3:5]}/{blueprint_id}/blueprint.png'
+        mock_get_status_manager.return_value.create_status.assert_called_once_with(
+            blueprint_id=blueprint_id,
+            message='Blueprint uploaded successfully. Processing started.'
+        )
+    
+    @patch('handler._c')
+    def test_lambda_handler_upload_too_large(self, mock_c):
+        """Test oversize uploads are rejected before decoding."""
+        event = {
+            'httpMethod': 'POST',
+            'path': '/api/v1/blueprints/upload',
+            'headers': {
+                'Content-Type': 'multipart/form-data; boundary=testboundary',
+                'Content-Length': str(MAX_IMAGE_BYTES * 2)
+            },
+            'body': 'not decoded',
+            'isBase64Encoded': True
+        }
+        
+        response = lambda_handler(event, None)
+        
+        assert response['statusCode'] == 413
+        assert json.loads(response['body'])['error'] == 'file_too_large'
+        mock_c.assert_not_called()
+    
+    @patch('handler.get_status_manager')
+    def test_lambda_handler_status_completed_single_read(self, mock_get_status_manager):
+        """Test a completed status is served from a single DynamoDB read."""
+        mock_sm = mock_get_status_manager.return_value
+        mock_sm.get_status.return_value = {
+            'blueprint_id': 'bp_test123', 'status': 'completed', 'processing_time_ms': 1500,
+            'detected_rooms': [{'id': 'room_001', 'bounding_box': [1, 2, 3, 4]}]
+        }
+        
+        event = {
+            'httpMethod': 'GET',
+            'path': '/api/v1/blueprints/bp_test123/status',
+            'pathParameters': {'blueprint_id': 'bp_test123'}
+        }
+        
+        response = lambda_handler(event, None)
+        
+        assert response['statusCode'] == 200
+        assert json.loads(response['body'])['detected_rooms'][0]['id'] == 'room_001'
+        mock_sm.get_status.assert_called_once_with('bp_test123')
+
+
+class TestMultipartParsing:
+    """Test multipart form data parsing."""
+    
+    def test_parse_multipart_skips_non_file_fields(self):
+        """Test the file part is found after other form fields."""
+        image_bytes = image_to_bytes(create_test_image(10, 10))
+        boundary = '----WebKitFormBoundary7MA4YWxk'
+        body = (
+            f'--{boundary}\r\n'
+            'Content-Disposition: form-data; name="description"\r\n\r\n'
+            'floor plan\r\n'
+            f'--{boundary}\r\n'
+            'Content-Disposition: form-data; name="file"; filename="plan.png"\r\n'
+            'Content-Type: image/png\r\n\r\n'
+        ).encode() + image_bytes + f'\r\n--{boundary}--\r\n'.encode()
+        
+        file_content, file_content_type = parse_multipart_form_data(
+            body, f'multipart/form-data; boundary="{boundary}"'
+        )
+        
+        assert file_content == image_bytes
+        assert file_content_type == 'image/png'
+    
+    def test_parse_multipart_lf_line_breaks(self):
+        """Test bodies using bare LF line breaks are still parsed."""
+        image_bytes = image_to_bytes(create_test_image(10, 10))
+        boundary = 'boundary123'
+        body = (
+            f'--{boundary}\n'
+            'Content-Disposition: form-data; name="file"; filename="plan.jpg"\n'
+            'Content-Type: image/jpeg\n\n'
+        ).encode() + image_bytes + f'\n--{boundary}--\n'.encode()
+        
+        file_content, file_content_type = parse_multipart_form_data(
+            body, f'multipart/form-data; boundary={boundary}'
+        )
+        
+        assert file_content == image_bytes
+        assert file_content_type == 'image/jpeg'
+
+
+class TestAwsMin:
+    """Test the SigV4-signed SageMaker runtime client."""
+    
+    credentials = Credentials('AKIDEXAMPLE', 'wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY', 'session-token')
+    
+    @patch('utils.aws_min._http')
+    @patch('utils.aws_min._credentials')
+    def test_invoke_endpoint_signature_matches_botocore(self, mock_credentials, mock_http):
+        """Test the request is signed exactly as botocore's SigV4Auth signs it."""
+        mock_credentials.return_value = self.credentials
+        mock_http.request.return_value = Mock(status=200, data=b'{"detected_rooms":[]}')
+        now = datetime.datetime(2024, 1, 2, 3, 4, 5)
+        body = b'\x89PNG fixed body'
+        
+        with patch('botocore.auth.get_current_datetime', return_value=now):
+            result = aws_min.invoke_endpoint('room detection', body, 'image/png')
+            
+            url = f'https://runtime.sagemaker.{aws_min.REGION}.amazonaws.com/endpoints/room%20detection/invocations'
+            expected = AWSRequest(
+                method='POST',
+                url=url,
+                data=body,
+                headers={'Content-Type': 'image/png', 'Accept': 'application/json'}
+            )
+            SigV4Auth(self.credentials, 'sagemaker', aws_min.REGION).add_auth(expected)
+        
+        assert result == b'{"detected_rooms":[]}'
+        args, kwargs = mock_http.request.call_args
+        assert args == ('POST', url)
+        assert kwargs['body'] == body
+        assert kwargs['headers'] == dict(expected.headers.items())
+        assert kwargs['headers']['X-Amz-Security-Token'] == 'session-token'
+        assert kwargs['headers']['Authorization'].startswith(
+            f'AWS4-HMAC-SHA256 Credential=AKIDEXAMPLE/20240102/{aws_min.REGION}/sagemaker/aws4_request'
+        )
+    
+    @patch('utils.aws_min._http')
+    @patch('utils.aws_min._credentials')
+    def test_invoke_endpoint_error_status(self, mock_credentials, mock_http):
+        """Test non-200 responses raise AwsRequestError with the status code."""
+        mock_credentials.return_value = self.credentials
+        mock_http.request.return_value = Mock(status=424, data=b'{"message":"model error"}')
+        
+        with pytest.raises(aws_min.AwsRequestError) as exc_info:
+            aws_min.invoke_endpoint('endpoint', b'body', 'image/png')
+        
+        assert exc_info.value.status == 424
+        assert 'model error' in str(exc_info.value)
+    
+    def test_throttling_responses_are_retried(self):
+        """Test 429 and 503 responses are retried like boto3's standard mode."""
+        retries = aws_min._http.connection_pool_kw['retries']
+        
+        assert retries.is_retry('POST', 429)
+        assert retries.is_retry('POST', 503)
+        assert not retries.is_retry('POST', 424)
+    
+    @patch.dict('os.environ', {'AWS_ACCESS_KEY_ID': 'AKID', 'AWS_SECRET_ACCESS_KEY': 'secret', 'AWS_SESSION_TOKEN': 'token'})
+    def test_credentials_from_environment(self):
+        """Test execution role credentials are read from the environment."""
+        credentials = aws_min._credentials()
+        
+        assert (credentials.access_key, credentials.secret_key, credentials.token) == ('AKID', 'secret', 'token')
+    
+    @patch('botocore.session.get_session')
+    def test_credentials_fall_back_to_botocore_chain(self, mock_get_session):
+        """Test credentials come from the botocore chain outside Lambda."""
+        mock_get_session.return_value.get_credentials.return_value = self.credentials
+        
+        with patch.dict('os.environ', {}, clear=True):
+            credentials = aws_min._credentials()
+        
+        assert credentials.access_key == 'AKIDEXAMPLE'
+        assert credentials.token == 'session-token'
+    
+    @patch('botocore.session.get_session')
+    def test_credentials_missing(self, mock_get_session):
+        """Test a missing credential chain raises AwsRequestError."""
+        mock_get_session.return_value.get_credentials.return_value = None
+        
+        with patch.dict('os.environ', {}, clear=True):
+            with pytest.raises(aws_min.AwsRequestError):
+                aws_min._credentials()
 
 
 if __name__ == '__main__':
@@ -6,12 +6,28 @@ import json
 import os
 import boto3
 from typing import Dict, Any
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
 from .status_manager import get_status_manager, StatusManagerError
 
-# Initialize Lambda client
-lambda_client = boto3.client('lambda')
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Initialize Lambda client with a keep-alive connection reused across warm invocations
+lambda_client = boto3.client(
+    'lambda',
+    config=Config(
+        max_pool_connections=2,
+        tcp_keepalive=True,
+        retries={'mode': 'standard'},
+        connect_timeout=2,
+        read_timeout=10
+    )
+)
 
 # Environment variables
 PROCESSING_LAMBDA_NAME = os.environ.get('PROCESSING_LAMBDA_NAME', 'room-detection-processor')
@@ -50,7 +66,8 @@ class AsyncProcessor:
             s3_key: S3 object key
         """
         try:
-            # Create initial status
+            # Create initial status before invoking, so a failed write never
+            # leaves a processing run started without a status record
             self.status_manager.create_status(
                 blueprint_id=blueprint_id,
                 message="Blueprint uploaded. Processing started."
@@ -66,7 +83,7 @@ class AsyncProcessor:
             lambda_client.invoke(
                 FunctionName=self.processing_lambda_name,
                 InvocationType='Event',  # Async invocation
-                Payload=json.dumps(payload)
+                Payload=orjson.dumps(payload) if HAS_ORJSON else json.dumps(payload)
             )
             
         except StatusManagerError as e:
@@ -105,14 +122,12 @@ class AsyncProcessor:
         return status
 
 
-# Singleton instance
-_async_processor = None
+# Singleton instance, built at import so it is part of the INIT phase (and of
+# a SnapStart snapshot) like the status manager it wraps
+_async_processor = AsyncProcessor()
 
 
 def get_async_processor() -> AsyncProcessor:
     """Get singleton async processor instance."""
-    global _async_processor
-    if _async_processor is None:
-        _async_processor = AsyncProcessor()
     return _async_processor
 
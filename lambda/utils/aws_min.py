@@ -0,0 +1,115 @@
+"""
+Minimal SigV4-signed client for the SageMaker runtime InvokeEndpoint call.
+
+Building a boto3 sagemaker-runtime client loads its service model and
+endpoint rules on every cold start. The handler only ever makes this one
+POST, so it is signed with botocore's SigV4Auth and sent over a shared
+urllib3 connection pool instead.
+"""
+
+import os
+from urllib.parse import quote
+
+import urllib3
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.credentials import Credentials
+
+# AWS_REGION is provided by the Lambda runtime
+REGION = os.environ.get('AWS_REGION', 'us-east-2')
+
+# SageMaker runtime requests are signed with the 'sagemaker' service name
+SAGEMAKER_SIGNING_NAME = 'sagemaker'
+
+# Throttling and unavailable responses are retried as boto3's standard mode
+# does; the endpoint rejects these before running the model
+RETRY_STATUS_CODES = (429, 503)
+
+# Connection pool reused across warm invocations. Connection failures and
+# RETRY_STATUS_CODES are retried with backoff; a request that timed out
+# while reading the response is never replayed.
+_http = urllib3.PoolManager(
+    maxsize=4,
+    timeout=urllib3.Timeout(connect=5, read=60),
+    retries=urllib3.Retry(
+        total=2,
+        read=0,
+        redirect=False,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset({'POST'}),
+        backoff_factor=0.2,
+        raise_on_status=False
+    )
+)
+
+
+class AwsRequestError(Exception):
+    """Raised when a signed AWS request fails."""
+
+    def __init__(self, message: str, status: int = None):
+        super().__init__(message)
+        self.status = status
+
+
+def _credentials() -> Credentials:
+    """
+    Get credentials for signing requests.
+
+    Returns:
+        Execution role credentials from the environment, falling back to
+        the default botocore credential chain outside Lambda
+    """
+    access_key = os.environ.get('AWS_ACCESS_KEY_ID')
+    secret_key = os.environ.get('AWS_SECRET_ACCESS_KEY')
+    if access_key and secret_key:
+        return Credentials(access_key, secret_key, os.environ.get('AWS_SESSION_TOKEN'))
+
+    import botocore.session
+    credentials = botocore.session.get_session().get_credentials()
+    if credentials is None:
+        raise AwsRequestError("Unable to locate AWS credentials")
+    return credentials.get_frozen_credentials()
+
+
+def invoke_endpoint(
+    endpoint_name: str,
+    body: bytes,
+    content_type: str,
+    accept: str = 'application/json'
+) -> bytes:
+    """
+    Invoke a SageMaker endpoint.
+
+    Args:
+        endpoint_name: SageMaker endpoint name
+        body: Request body
+        content_type: MIME type of body
+        accept: Desired MIME type of the response
+
+    Returns:
+        Raw response body
+    """
+    url = (
+        f"https://runtime.sagemaker.{REGION}.amazonaws.com"
+        f"/endpoints/{quote(endpoint_name, safe='')}/invocations"
+    )
+    request = AWSRequest(
+        method='POST',
+        url=url,
+        data=body,
+        headers={'Content-Type': content_type, 'Accept': accept}
+    )
+    SigV4Auth(_credentials(), SAGEMAKER_SIGNING_NAME, REGION).add_auth(request)
+
+    try:
+        response = _http.request('POST', url, body=body, headers=dict(request.headers.items()))
+    except urllib3.exceptions.HTTPError as e:
+        raise AwsRequestError(f"InvokeEndpoint request failed: {str(e)}")
+
+    if response.status != 200:
+        raise AwsRequestError(
+            f"InvokeEndpoint returned HTTP {response.status}: "
+            f"{response.data.decode('utf-8', errors='replace')}",
+            status=response.status
+        )
+    return response.data
@@ -3,6 +3,45 @@ Coordinate transformation utilities for Lambda function.
 Handles transformation from pixel coordinates to normalized 0-1000 range.
 """
 
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+@lru_cache(maxsize=128)
+def _resize_geometry(
+    original_width: int,
+    original_height: int,
+    target_width: int,
+    target_height: int
+) -> tuple:
+    """
+    Letterbox geometry for fitting an image into the target size.
+    
+    Cached because uploads share a handful of page sizes and the target
+    size is fixed.
+    
+    Args:
+        original_width: Original image width
+        original_height: Original image height
+        target_width: Target width
+        target_height: Target height
+        
+    Returns:
+        Tuple of (scale, new_width, new_height, pad_x, pad_y)
+    """
+    # Scaling factor to fit image within target size (aspect ratio kept)
+    scale = min(target_width / original_width, target_height / original_height)
+    
+    new_width = int(original_width * scale)
+    new_height = int(original_height * scale)
+    pad_x = (target_width - new_width) // 2
+    pad_y = (target_height - new_height) // 2
+    
+    return scale, new_width, new_height, pad_x, pad_y
+
 
 def transform_coordinates_to_normalized(
     x_min: float,
@@ -38,11 +77,11 @@ def transform_coordinates_to_normalized(
     x_max_1000 = int(x_max_norm * 1000)
     y_max_1000 = int(y_max_norm * 1000)
     
-    # Ensure values are within 0-1000 range
-    x_min_1000 = max(0, min(1000, x_min_1000))
-    y_min_1000 = max(0, min(1000, y_min_1000))
-    x_max_1000 = max(0, min(1000, x_max_1000))
-    y_max_1000 = max(0, min(1000, y_max_1000))
+    # Ensure values are within 0-1000 range (conditionals avoid 8 min/max calls)
+    x_min_1000 = 0 if x_min_1000 < 0 else (1000 if x_min_1000 > 1000 else x_min_1000)
+    y_min_1000 = 0 if y_min_1000 < 0 else (1000 if y_min_1000 > 1000 else y_min_1000)
+    x_max_1000 = 0 if x_max_1000 < 0 else (1000 if x_max_1000 > 1000 else x_max_1000)
+    y_max_1000 = 0 if y_max_1000 < 0 else (1000 if y_max_1000 > 1000 else y_max_1000)
     
     return (x_min_1000, y_min_1000, x_max_1000, y_max_1000)
 
@@ -74,14 +113,18 @@ def transform_bounding_box(
     """
     x_min_resized, y_min_resized, x_max_resized, y_max_resized = bounding_box
     
-    # Calculate scaling factor (assuming aspect ratio was maintained with padding)
-    scale = min(resized_width / original_width, resized_height / original_height)
+    # Image was not resized: no scale or padding to undo
+    if original_width == resized_width and original_height == resized_height:
+        return list(transform_coordinates_to_normalized(
+            x_min_resized, y_min_resized,
+            x_max_resized, y_max_resized,
+            original_width, original_height
+        ))
     
-    # Calculate padding offsets
-    new_width = int(original_width * scale)
-    new_height = int(original_height * scale)
-    pad_x = (resized_width - new_width) // 2
-    pad_y = (resized_height - new_height) // 2
+    # Scaling factor and padding offsets (aspect ratio was maintained with padding)
+    scale, _, _, pad_x, pad_y = _resize_geometry(
+        original_width, original_height, resized_width, resized_height
+    )
     
     # Transform back to original image coordinates
     x_min_original = (x_min_resized - pad_x) / scale
@@ -96,3 +139,45 @@ def transform_bounding_box(
         original_width, original_height
     ))
 
+
+def transform_bounding_boxes(
+    bounding_boxes,
+    original_width: int,
+    original_height: int,
+    resized_width: int = 640,
+    resized_height: int = 640
+) -> 'np.ndarray':
+    """
+    Vectorized transform_bounding_box for many boxes at once.
+    
+    Produces the same values as calling transform_bounding_box per box,
+    without a Python-level loop over detections.
+    
+    Args:
+        bounding_boxes: Array-like of shape (N, 4) with [x_min, y_min, x_max, y_max]
+                        rows in resized image coordinates
+        original_width: Original image width
+        original_height: Original image height
+        resized_width: Resized image width (default 640)
+        resized_height: Resized image height (default 640)
+        
+    Returns:
+        Integer array of shape (N, 4) in normalized 0-1000 range
+    """
+    # Imported here so the scalar transforms don't pull NumPy into cold starts
+    import numpy as np
+    
+    boxes = np.asarray(bounding_boxes, dtype=np.float64).reshape(-1, 4)
+    
+    # Same letterbox geometry as transform_bounding_box
+    scale, _, _, pad_x, pad_y = _resize_geometry(
+        original_width, original_height, resized_width, resized_height
+    )
+    
+    # Back to original pixels, then normalize to 0-1000 (truncating like int())
+    normalized = (boxes - np.array([pad_x, pad_y, pad_x, pad_y])) / scale
+    normalized /= np.array([original_width, original_height, original_width, original_height])
+    normalized *= 1000
+    result = normalized.astype(np.int64)
+    np.clip(result, 0, 1000, out=result)
+    return result
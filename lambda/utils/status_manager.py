@@ -2,24 +2,71 @@
 Status manager for tracking blueprint processing status in DynamoDB.
 """
 
+import gzip
+import json
 import os
 import time
-import json
 import boto3
 from typing import Dict, Any, Optional
+from boto3.dynamodb.types import Binary
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from datetime import datetime, timedelta
 from decimal import Decimal
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Keep-alive connections reused across warm invocations; a small pool covers
+# the handler's status write overlapping its other AWS calls
+_DYNAMODB_CONFIG = Config(
+    max_pool_connections=4,
+    tcp_keepalive=True,
+    retries={'total_max_attempts': 3, 'mode': 'standard'},
+    connect_timeout=2,
+    read_timeout=10
+)
+
 # Initialize DynamoDB client
-dynamodb = boto3.resource('dynamodb')
+dynamodb = boto3.resource('dynamodb', config=_DYNAMODB_CONFIG)
 
 # Table name from environment variable or default
 STATUS_TABLE_NAME = os.environ.get('STATUS_TABLE_NAME', 'room-detection-status-dev')
 
+# Table resource for the default table, built once per container
+_DEFAULT_TABLE = dynamodb.Table(STATUS_TABLE_NAME)
+
 # TTL for status records (7 days)
 STATUS_TTL_SECONDS = 7 * 24 * 60 * 60
 
+# Every status attribute except the (potentially large) detected_rooms list
+_SUMMARY_PROJECTION = "blueprint_id, #status, #message, #error, created_at, updated_at, processing_time_ms"
+_SUMMARY_ATTRIBUTE_NAMES = {'#status': 'status', '#message': 'message', '#error': 'error'}
+
+# detected_rooms is stored as gzipped JSON in a Binary attribute: several
+# times smaller than a nested map, and no per-number Decimal conversion
+ROOMS_GZIP_LEVEL = 6
+
+
+def _encode_rooms(detected_rooms: list) -> Binary:
+    """Serialize detected rooms to a compressed Binary attribute value."""
+    if HAS_ORJSON:
+        payload = orjson.dumps(detected_rooms)
+    else:
+        payload = json.dumps(detected_rooms, separators=(',', ':')).encode('utf-8')
+    return Binary(gzip.compress(payload, compresslevel=ROOMS_GZIP_LEVEL))
+
+
+def _decode_rooms(value: Binary) -> list:
+    """Deserialize detected rooms written by _encode_rooms."""
+    payload = gzip.decompress(value.value)
+    if HAS_ORJSON:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
 
 class StatusManagerError(Exception):
     """Custom exception for status manager errors."""
@@ -37,7 +84,10 @@ class StatusManager:
             table_name: DynamoDB table name (defaults to STATUS_TABLE_NAME env var)
         """
         self.table_name = table_name or STATUS_TABLE_NAME
-        self.table = dynamodb.Table(self.table_name)
+        if self.table_name == STATUS_TABLE_NAME:
+            self.table = _DEFAULT_TABLE
+        else:
+            self.table = dynamodb.Table(self.table_name)
     
     def create_status(self, blueprint_id: str, message: str = "Processing started") -> None:
         """
@@ -48,19 +98,38 @@ class StatusManager:
             message: Status message
         """
         try:
-            ttl = int(time.time()) + STATUS_TTL_SECONDS
+            # One clock read for both the TTL epoch and the ISO timestamps
+            now_epoch = time.time()
+            ttl = int(now_epoch) + STATUS_TTL_SECONDS
+            now = datetime.utcfromtimestamp(now_epoch).isoformat()
             
-            self.table.put_item(
-                Item={
-                    'blueprint_id': blueprint_id,
-                    'status': 'processing',
-                    'message': message,
-                    'created_at': datetime.utcnow().isoformat(),
-                    'updated_at': datetime.utcnow().isoformat(),
-                    'ttl': ttl
+            # Idempotent upsert: safe to retry, and never rolls back a record
+            # that processing has already moved to completed or failed
+            self.table.update_item(
+                Key={'blueprint_id': blueprint_id},
+                UpdateExpression=(
+                    "SET #status = if_not_exists(#status, :processing), "
+                    "created_at = if_not_exists(created_at, :now), "
+                    "updated_at = :now, "
+                    "#message = :message, "
+                    "#ttl = if_not_exists(#ttl, :ttl)"
+                ),
+                ConditionExpression="attribute_not_exists(blueprint_id) OR #status = :processing",
+                ExpressionAttributeNames={
+                    '#status': 'status',
+                    '#message': 'message',
+                    '#ttl': 'ttl'
+                },
+                ExpressionAttributeValues={
+                    ':processing': 'processing',
+                    ':now': now,
+                    ':message': message,
+                    ':ttl': ttl
                 }
             )
         except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return  # Record already finished processing
             raise StatusManagerError(f"Failed to create status: {str(e)}")
     
     def update_status(
@@ -108,10 +177,8 @@ class StatusManager:
                 expression_attribute_values[':processing_time_ms'] = processing_time_ms
             
             if detected_rooms is not None:
-                # Convert floats to Decimal for DynamoDB
-                detected_rooms_converted = json.loads(json.dumps(detected_rooms), parse_float=Decimal)
                 update_expression_parts.append("detected_rooms = :detected_rooms")
-                expression_attribute_values[':detected_rooms'] = detected_rooms_converted
+                expression_attribute_values[':detected_rooms'] = _encode_rooms(detected_rooms)
             
             if error is not None:
                 update_expression_parts.append("#error = :error")
@@ -129,29 +196,46 @@ class StatusManager:
         except ClientError as e:
             raise StatusManagerError(f"Failed to update status: {str(e)}")
     
-    def get_status(self, blueprint_id: str) -> Optional[Dict[str, Any]]:
+    def get_status(self, blueprint_id: str, include_rooms: bool = True) -> Optional[Dict[str, Any]]:
         """
         Get status record.
         
         Args:
             blueprint_id: Unique blueprint identifier
+            include_rooms: Whether to read detected_rooms; pass False when
+                only the status summary is needed
             
         Returns:
             Status dictionary or None if not found (all Decimals converted to floats)
         """
         try:
-            response = self.table.get_item(
-                Key={'blueprint_id': blueprint_id}
-            )
+            if include_rooms:
+                response = self.table.get_item(
+                    Key={'blueprint_id': blueprint_id}
+                )
+            else:
+                response = self.table.get_item(
+                    Key={'blueprint_id': blueprint_id},
+                    ProjectionExpression=_SUMMARY_PROJECTION,
+                    ExpressionAttributeNames=_SUMMARY_ATTRIBUTE_NAMES
+                )
             
             if 'Item' in response:
                 item = response['Item']
                 # Remove TTL from response (internal field)
                 item.pop('ttl', None)
                 
+                detected_rooms = item.pop('detected_rooms', None)
+                
                 # Convert ALL Decimals to floats recursively
                 item = self._convert_decimals_to_floats(item)
                 
+                if isinstance(detected_rooms, Binary):
+                    item['detected_rooms'] = _decode_rooms(detected_rooms)
+                elif detected_rooms is not None:
+                    # Records written before rooms were compressed hold a list
+                    item['detected_rooms'] = self._convert_decimals_to_floats(detected_rooms)
+                
                 return item
             return None
         except ClientError as e:
@@ -222,14 +306,12 @@ class StatusManager:
         )
 
 
-# Singleton instance
-_status_manager = None
+# Singleton instance, built at import so it is part of the INIT phase (and of
+# a SnapStart snapshot); boto3 still resolves credentials on first request
+_status_manager = StatusManager()
 
 
 def get_status_manager() -> StatusManager:
     """Get singleton status manager instance."""
-    global _status_manager
-    if _status_manager is None:
-        _status_manager = StatusManager()
     return _status_manager
 
@@ -9,7 +9,7 @@ import sys
 import json
 from pathlib import Path
 from collections import defaultdict
-import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
 
 try:
     from PIL import Image
@@ -20,23 +20,31 @@ except ImportError:
     print("Warning: PIL not installed. Install with: pip install Pillow numpy")
     print("Image analysis will be limited.")
 
+from svg_utils import parse_svg
+
+# Longest edge the quality statistics are computed at. A mean and a spread
+# over the whole image barely move when it is downsampled to this size.
+QUALITY_SAMPLE_SIZE = (512, 512)
+
 def analyze_svg_structure(svg_path):
     """Check if SVG has proper room structure."""
     try:
-        tree = ET.parse(svg_path)
+        tree = parse_svg(svg_path)
         root = tree.getroot()
         
         room_count = 0
         has_polygons = False
         
         for elem in root.iter():
-            class_attr = elem.get('class', '')
-            if 'Space' in class_attr and not class_attr.startswith('SpaceDimensions'):
+            class_attr = elem.get('class')
+            if class_attr and 'Space' in class_attr and not class_attr.startswith('SpaceDimensions'):
                 room_count += 1
-                for child in elem.iter():
-                    if child.tag.endswith('polygon'):
-                        has_polygons = True
-                        break
+                # One polygon is enough; later rooms only need counting
+                if not has_polygons:
+                    for child in elem.iter():
+                        if child.tag.endswith('polygon'):
+                            has_polygons = True
+                            break
         
         return {
             'has_structure': room_count > 0 and has_polygons,
@@ -53,20 +61,30 @@ def analyze_image_quality(png_path):
     
     try:
         img = Image.open(png_path)
+        # Report the source size, not the downsampled one
+        width, height = img.size
+        
+        # Nearest-neighbour keeps a sample of real pixels; filtering would
+        # blur thin wall lines and understate the spread. Any mode can be
+        # sampled this way, so the RGB conversion only sees the small image.
+        scale = min(1.0, QUALITY_SAMPLE_SIZE[0] / img.width, QUALITY_SAMPLE_SIZE[1] / img.height)
+        if scale < 1.0:
+            sample_size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+            img = img.resize(sample_size, Image.Resampling.NEAREST)
         
         # Convert to RGB if needed
         if img.mode != 'RGB':
             img = img.convert('RGB')
         
-        img_array = np.array(img)
+        img_array = np.asarray(img)
         
         # Check if image is mostly grayscale
-        # Calculate variance across color channels
-        r, g, b = img_array[:, :, 0], img_array[:, :, 1], img_array[:, :, 2]
-        color_variance = np.std([r, g, b])
+        # Spread of values over all pixels and channels, reduced in place
+        # on the (H, W, 3) array rather than a stacked copy of the channels
+        color_variance = img_array.std()
         
         # Check if image is mostly white/light (typical for blueprints)
-        mean_brightness = np.mean(img_array)
+        mean_brightness = img_array.mean()
         
         # Simple heuristic: if color variance is low, it's grayscale
         is_grayscale = color_variance < 20
@@ -82,8 +100,8 @@ def analyze_image_quality(png_path):
             'color_variance': float(color_variance),
             'mean_brightness': float(mean_brightness),
             'usable': bool(usable),
-            'width': int(img.width),
-            'height': int(img.height)
+            'width': int(width),
+            'height': int(height)
         }
     except Exception as e:
         return {'usable': False, 'error': str(e)}
@@ -125,8 +143,13 @@ def process_sample(sample_dir):
     
     return result
 
-def analyze_dataset(dataset_root, split_files=None):
-    """Analyze entire dataset."""
+def analyze_dataset(dataset_root, split_files=None, workers=None):
+    """
+    Analyze entire dataset.
+    
+    Samples are independent, so they are analyzed in parallel across
+    `workers` processes (None = one per CPU, 1 = in-process).
+    """
     dataset_root = Path(dataset_root)
     
     # Get samples from split files if provided
@@ -160,25 +183,37 @@ def analyze_dataset(dataset_root, split_files=None):
     results = []
     stats = defaultdict(int)
     
-    for i, sample_dir in enumerate(sorted(all_samples)):
-        if (i + 1) % 100 == 0:
-            print(f"  Processed {i + 1}/{len(all_samples)} samples...")
-        
-        result = process_sample(sample_dir)
-        results.append(result)
+    workers = workers or os.cpu_count() or 1
+    samples = sorted(all_samples)
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(samples) > 1 else None
+    try:
+        # Results arrive in sample order either way
+        if executor:
+            sample_results = executor.map(process_sample, samples, chunksize=16)
+        else:
+            sample_results = map(process_sample, samples)
         
-        # Update stats
-        stats['total'] += 1
-        if result['has_svg']:
-            stats['has_svg'] += 1
-        if result.get('has_structure', False):
-            stats['has_structure'] += 1
-        if result.get('room_count', 0) >= 3:
-            stats['has_3plus_rooms'] += 1
-        if result.get('img_usable', True):
-            stats['usable_image'] += 1
-        if result['valid']:
-            stats['valid_samples'] += 1
+        for i, result in enumerate(sample_results):
+            if (i + 1) % 100 == 0:
+                print(f"  Processed {i + 1}/{len(all_samples)} samples...")
+            
+            results.append(result)
+            
+            # Update stats
+            stats['total'] += 1
+            if result['has_svg']:
+                stats['has_svg'] += 1
+            if result.get('has_structure', False):
+                stats['has_structure'] += 1
+            if result.get('room_count', 0) >= 3:
+                stats['has_3plus_rooms'] += 1
+            if result.get('img_usable', True):
+                stats['usable_image'] += 1
+            if result['valid']:
+                stats['valid_samples'] += 1
+    finally:
+        if executor:
+            executor.shutdown()
     
     # Summary
     print(f"\n=== Dataset Analysis Summary ===")
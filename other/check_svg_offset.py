@@ -4,18 +4,19 @@ Improved bounding box extraction that accounts for SVG viewBox offsets.
 This ensures bounding boxes align with the actual wall boundaries in PNG images.
 """
 
-import xml.etree.ElementTree as ET
 import json
 import sys
 from pathlib import Path
 
+from svg_utils import parse_svg
+
 def parse_polygon_points(points_str):
     """Parse SVG polygon points string into list of (x, y) tuples."""
     if not points_str:
         return []
     
-    coords = [float(x) for x in points_str.replace(',', ' ').split() if x.strip()]
-    points = [(coords[i], coords[i+1]) for i in range(0, len(coords), 2)]
+    coords = list(map(float, points_str.replace(',', ' ').split()))
+    points = list(zip(coords[0::2], coords[1::2]))
     return points
 
 def calculate_bounding_box(points):
@@ -23,8 +24,7 @@ def calculate_bounding_box(points):
     if not points:
         return None
     
-    xs = [p[0] for p in points]
-    ys = [p[1] for p in points]
+    xs, ys = zip(*points)
     
     return [min(xs), min(ys), max(xs), max(ys)]
 
@@ -53,7 +53,7 @@ def get_svg_dimensions_and_offset(root):
 def extract_rooms_from_svg_improved(svg_path):
     """Extract rooms accounting for viewBox offsets."""
     try:
-        tree = ET.parse(svg_path)
+        tree = parse_svg(svg_path)
         root = tree.getroot()
     except Exception as e:
         print(f"Error parsing {svg_path}: {e}", file=sys.stderr)
@@ -81,11 +81,13 @@ def extract_rooms_from_svg_improved(svg_path):
                 points = parse_polygon_points(points_str)
                 
                 if points:
-                    # Adjust points for viewBox offset
-                    adjusted_points = [(p[0] - offset_x, p[1] - offset_y) for p in points]
-                    bbox = calculate_bounding_box(adjusted_points)
-                    
+                    # Adjust for viewBox offset. A translation keeps the
+                    # min/max points, so only the box corners need shifting.
+                    bbox = calculate_bounding_box(points)
                     if bbox:
+                        bbox = [bbox[0] - offset_x, bbox[1] - offset_y,
+                                bbox[2] - offset_x, bbox[3] - offset_y]
+                        
                         room_data = {
                             "id": f"room_{room_id_counter:03d}",
                             "bounding_box": bbox,
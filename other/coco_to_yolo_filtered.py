@@ -18,11 +18,13 @@ def coco_bbox_to_yolo(bbox, img_width, img_height):
     height_norm = h / img_height
     return center_x, center_y, width_norm, height_norm
 
+DATASET_FOLDERS = ('high_quality', 'high_quality_architectural', 'colorful')
+
 def extract_folder_from_path(image_path):
     """Extract folder name from COCO image path."""
     parts = Path(image_path).parts
     for part in parts:
-        if part in ['high_quality', 'high_quality_architectural', 'colorful']:
+        if part in DATASET_FOLDERS:
             return part
     return None
 
@@ -58,11 +60,16 @@ def convert_coco_to_yolo_filtered(
     images = {img['id']: img for img in coco_data['images']}
     categories = {cat['id']: cat for cat in coco_data['categories']}
     
+    # Resolve each image's folder once; filtering and stats both need it
+    image_folders = {
+        img_id: extract_folder_from_path(img_info['file_name'])
+        for img_id, img_info in images.items()
+    }
+    
     # Filter images by folder
     if include_folders or exclude_folders:
         filtered_image_ids = set()
-        for img_id, img_info in images.items():
-            folder = extract_folder_from_path(img_info['file_name'])
+        for img_id, folder in image_folders.items():
             if folder:
                 if include_folders and folder not in include_folders:
                     continue
@@ -100,7 +107,7 @@ def convert_coco_to_yolo_filtered(
         file_name = image_info['file_name']
         
         # Track folder
-        folder = extract_folder_from_path(file_name)
+        folder = image_folders[image_id]
         if folder:
             stats['by_folder'][folder] += 1
         
@@ -164,13 +171,13 @@ def main():
     parser.add_argument(
         '--include-folders',
         nargs='+',
-        choices=['high_quality', 'high_quality_architectural', 'colorful'],
+        choices=DATASET_FOLDERS,
         help='Only include images from these folders'
     )
     parser.add_argument(
         '--exclude-folders',
         nargs='+',
-        choices=['high_quality', 'high_quality_architectural', 'colorful'],
+        choices=DATASET_FOLDERS,
         help='Exclude images from these folders'
     )
     
@@ -4,22 +4,23 @@ Extract room bounding boxes from structured SVG floor plans.
 Converts SVG polygon coordinates to normalized 0-1000 bounding boxes.
 """
 
-import xml.etree.ElementTree as ET
 import json
 import os
 import sys
 from pathlib import Path
 
+from svg_utils import parse_svg
+
 def parse_polygon_points(points_str):
     """Parse SVG polygon points string into list of (x, y) tuples."""
     if not points_str:
         return []
     
-    # Split by spaces and commas, filter empty strings
-    coords = [float(x) for x in points_str.replace(',', ' ').split() if x.strip()]
+    # Split by spaces and commas; split() never yields empty strings
+    coords = list(map(float, points_str.replace(',', ' ').split()))
     
     # Group into (x, y) pairs
-    points = [(coords[i], coords[i+1]) for i in range(0, len(coords), 2)]
+    points = list(zip(coords[0::2], coords[1::2]))
     return points
 
 def calculate_bounding_box(points):
@@ -101,7 +102,7 @@ def extract_room_type(class_attr):
 def extract_rooms_from_svg(svg_path):
     """Extract all rooms from an SVG file."""
     try:
-        tree = ET.parse(svg_path)
+        tree = parse_svg(svg_path)
         root = tree.getroot()
     except Exception as e:
         print(f"Error parsing {svg_path}: {e}", file=sys.stderr)
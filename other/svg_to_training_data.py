@@ -23,8 +23,8 @@ def parse_polygon_points(points_str):
     if not points_str:
         return []
     
-    coords = [float(x) for x in points_str.replace(',', ' ').split() if x.strip()]
-    points = [(coords[i], coords[i+1]) for i in range(0, len(coords), 2)]
+    coords = list(map(float, points_str.replace(',', ' ').split()))
+    points = list(zip(coords[0::2], coords[1::2]))
     return points
 
 def calculate_bounding_box(points):
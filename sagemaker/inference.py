@@ -62,7 +62,7 @@ def input_fn(request_body, request_content_type):
         else:
             raise ValueError("Input must contain 'image' (base64) or 'image_url'")
     
-    elif request_content_type == 'image/jpeg' or request_content_type == 'image/png':
+    elif request_content_type in ('image/jpeg', 'image/png', 'application/x-image'):
         # Direct image binary
         image = Image.open(io.BytesIO(request_body))
         return image
@@ -1,23 +1,38 @@
 #!/usr/bin/env python3
 import boto3
+from botocore.exceptions import WaiterError
+
+ENDPOINT_NAME = 'room-detection-yolov8-endpoint'
 
 sm = boto3.client('sagemaker', region_name='us-east-2')
-response = sm.describe_endpoint(EndpointName='room-detection-yolov8-endpoint')
+response = sm.describe_endpoint(EndpointName=ENDPOINT_NAME)
 
 status = response['EndpointStatus']
 print(f"Endpoint Status: {status}")
 
+if status in ('Creating', 'Updating', 'SystemUpdating'):
+    print("\n⏳ Still updating... (~5-10 minutes total)")
+    print("Waiting for the endpoint to come into service (Ctrl+C to stop)...")
+    try:
+        # The waiter polls describe_endpoint until InService, stopping early on Failed
+        sm.get_waiter('endpoint_in_service').wait(
+            EndpointName=ENDPOINT_NAME,
+            WaiterConfig={'Delay': 30, 'MaxAttempts': 40}
+        )
+        status = 'InService'
+    except WaiterError as e:
+        response = e.last_response
+        status = response.get('EndpointStatus', status)
+        if status not in ('Failed', 'InService'):
+            print(f"\n⚠️  Gave up waiting; endpoint is still {status}")
+
 if status == 'InService':
     print("\n✅ READY TO TEST!")
     print("The endpoint is running on ml.t2.medium")
     print("\n👉 Go upload a blueprint now at: http://localhost:5173")
-elif status == 'Updating':
-    print("\n⏳ Still updating... (~5-10 minutes total)")
-    print("Wait a few more minutes and check again.")
 elif status == 'Failed':
     print("\n❌ Update failed!")
     if 'FailureReason' in response:
         print(f"Reason: {response['FailureReason']}")
-else:
+elif status not in ('Creating', 'Updating', 'SystemUpdating'):
     print(f"\n⚠️  Unknown status: {status}")
-
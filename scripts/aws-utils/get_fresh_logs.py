@@ -31,27 +31,34 @@ try:
     
     start_time = int((datetime.now() - timedelta(minutes=10)).timestamp() * 1000)
     
+    print("RECENT ERROR LOGS:\n")
+    
+    # Filter for errors and warnings server-side so only matching events are transferred
+    error_pattern = '?ERROR ?WARN ?Exception ?Traceback ?died ?failed ?crash'
+    
+    paginator = client.get_paginator('filter_log_events')
+    error_events = []
+    for page in paginator.paginate(
+        logGroupName=log_group,
+        logStreamNames=[stream_name],
+        startTime=start_time,
+        filterPattern=error_pattern
+    ):
+        error_events.extend(page['events'])
+    
+    for event in error_events[-50:]:
+        message = event['message'].strip()
+        timestamp = datetime.fromtimestamp(event['timestamp'] / 1000)
+        print(f"[{timestamp.strftime('%H:%M:%S')}] {message}")
+    
     events = client.get_log_events(
         logGroupName=log_group,
         logStreamName=stream_name,
         startTime=start_time,
         startFromHead=False,
-        limit=100
+        limit=30
     )
     
-    print("RECENT ERROR LOGS:\n")
-    
-    # Filter for errors and warnings
-    error_keywords = ['ERROR', 'WARN', 'Exception', 'Traceback', 'died', 'failed', 'crash']
-    
-    for event in events['events'][-50:]:
-        message = event['message'].strip()
-        
-        # Show all errors/warnings
-        if any(keyword in message for keyword in error_keywords):
-            timestamp = datetime.fromtimestamp(event['timestamp'] / 1000)
-            print(f"[{timestamp.strftime('%H:%M:%S')}] {message}")
-    
     print("\n" + "=" * 80)
     print("\nALL RECENT LOGS (last 30):\n")
     
@@ -1,5 +1,6 @@
 #!/bin/bash
-# Create Lambda Layer with Pillow and numpy for Python 3.10
+# Create Lambda Layer with Pillow, numpy and the optional accelerators
+# (lambda/requirements-optional.txt) for Python 3.10
 
 set -e
 
@@ -15,12 +16,14 @@ LAYER_DIR="$TEMP_DIR/python"
 
 mkdir -p "$LAYER_DIR"
 
-echo "Installing Pillow and numpy for Linux (Python 3.10)..."
+echo "Installing Pillow, numpy, orjson and opencv-python-headless for Linux (Python 3.10)..."
 
 # Install dependencies for Linux
 pip install \
     Pillow==10.0.0 \
     numpy==1.24.3 \
+    orjson==3.9.10 \
+    opencv-python-headless==4.8.1.78 \
     -t "$LAYER_DIR" \
     --platform manylinux2014_x86_64 \
     --only-binary :all: \
@@ -40,7 +43,7 @@ echo ""
 echo "Creating Lambda Layer: $LAYER_NAME"
 LAYER_ARN=$(aws lambda publish-layer-version \
     --layer-name "$LAYER_NAME" \
-    --description "Pillow and numpy for room detection Lambda" \
+    --description "Pillow, numpy, orjson and opencv-python-headless for room detection Lambda" \
     --zip-file fileb://layer.zip \
     --compatible-runtimes "$PYTHON_VERSION" \
     --region "$REGION" \
@@ -4,20 +4,23 @@ Improved bounding box extraction that uses actual SVG polygon points
 and properly transforms them to PNG coordinates for accurate alignment.
 """
 
-import xml.etree.ElementTree as ET
 import json
 import sys
 from pathlib import Path
 from PIL import Image, ImageDraw
 import numpy as np
 
+# Add other/ to path for the shared SVG parser
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'other'))
+from svg_utils import parse_svg
+
 def parse_polygon_points(points_str):
     """Parse SVG polygon points string into list of (x, y) tuples."""
     if not points_str:
         return []
     
-    coords = [float(x) for x in points_str.replace(',', ' ').split() if x.strip()]
-    points = [(coords[i], coords[i+1]) for i in range(0, len(coords), 2)]
+    coords = list(map(float, points_str.replace(',', ' ').split()))
+    points = list(zip(coords[0::2], coords[1::2]))
     return points
 
 def get_svg_dimensions(root):
@@ -39,7 +42,7 @@ def transform_points_to_png(points, svg_width, svg_height, png_width, png_height
     scale_x = png_width / svg_width
     scale_y = png_height / svg_height
     
-    transformed = [(int(p[0] * scale_x), int(p[1] * scale_y)) for p in points]
+    transformed = [(int(x * scale_x), int(y * scale_y)) for x, y in points]
     return transformed
 
 def calculate_bbox_from_points(points):
@@ -47,8 +50,9 @@ def calculate_bbox_from_points(points):
     if not points:
         return None
     
-    xs = [p[0] for p in points]
-    ys = [p[1] for p in points]
+    # A single zip beats np.asarray here; converting the point list
+    # dominates on room-sized polygons
+    xs, ys = zip(*points)
     
     return [min(xs), min(ys), max(xs), max(ys)]
 
@@ -57,7 +61,7 @@ def extract_and_visualize_rooms(svg_path, png_path, output_path):
     Extract rooms from SVG and visualize them directly on PNG with accurate coordinates.
     """
     # Parse SVG
-    tree = ET.parse(svg_path)
+    tree = parse_svg(svg_path)
     root = tree.getroot()
     
     svg_width, svg_height = get_svg_dimensions(root)
@@ -88,7 +92,7 @@ def extract_and_visualize_rooms(svg_path, png_path, output_path):
                     polygon = child
                     break
             
-            if polygon:
+            if polygon is not None:
                 points_str = polygon.get('points', '')
                 svg_points = parse_polygon_points(points_str)
                 
@@ -11,53 +11,151 @@ from pathlib import Path
 import sys
 
 def parse_points(points_str):
-    """Parse SVG polygon points."""
+    """Parse SVG polygon points into an (N, 2) array."""
     if not points_str:
-        return []
-    coords = [float(x) for x in points_str.replace(',', ' ').split() if x.strip()]
-    return [(coords[i], coords[i+1]) for i in range(0, len(coords), 2)]
+        return np.empty((0, 2), dtype=np.float64)
+    coords = np.fromstring(points_str.replace(',', ' '), sep=' ', dtype=np.float64)
+    return coords.reshape(-1, 2)
 
 def detect_wall_positions(png_array, threshold=50):
     """Detect wall positions in PNG to help with alignment."""
     height, width = png_array.shape
     
-    # Find horizontal walls
-    h_walls = []
-    for y in range(height):
-        wall_pixels = np.sum(png_array[y, :] < threshold)
-        if wall_pixels > width * 0.1:
-            h_walls.append(y)
+    # Count dark pixels per row and per column in a single pass over the image
+    mask = png_array < threshold
+    h_counts = mask.sum(axis=1)
+    v_counts = mask.sum(axis=0)
     
-    # Find vertical walls
-    v_walls = []
-    for x in range(width):
-        wall_pixels = np.sum(png_array[:, x] < threshold)
-        if wall_pixels > height * 0.1:
-            v_walls.append(x)
+    # Rows/columns with enough dark pixels are treated as walls
+    h_walls = np.flatnonzero(h_counts > width * 0.1).tolist()
+    v_walls = np.flatnonzero(v_counts > height * 0.1).tolist()
     
     return h_walls, v_walls
 
-def detect_offset_by_wall_alignment(svg_path, png_path):
+EXCLUDED_SPACE_TYPES = ('Window', 'Door', 'Wall', 'FixedFurniture')
+
+def is_room_space(class_attr):
+    """Check whether an SVG class attribute marks a room Space."""
+    if 'Space' not in class_attr or class_attr.startswith('SpaceDimensions'):
+        return False
+    return not any(excluded in class_attr for excluded in EXCLUDED_SPACE_TYPES)
+
+def read_svg_spaces(svg_path):
     """
-    Detect offset by trying to align SVG room edges with detected walls in PNG.
+    Stream-parse an SVG and collect the polygon points of every room Space.
+    
+    Elements are cleared and detached as soon as they are closed, so memory
+    stays bounded by the nesting depth instead of the size of the document.
+    
+    Returns:
+        Tuple of (svg_width, svg_height, list of (N, 2) point arrays)
     """
-    # Parse SVG
-    tree = ET.parse(svg_path)
-    root = tree.getroot()
-    
-    svg_width = float(root.get('width', 1000))
-    svg_height = float(root.get('height', 1000))
-    viewbox = root.get('viewBox', '')
-    if viewbox:
-        parts = viewbox.split()
-        if len(parts) >= 4:
-            svg_width = float(parts[2])
-            svg_height = float(parts[3])
+    svg_width = svg_height = 1000.0
+    spaces = []
+    stack = []
+    open_spaces = 0
+    
+    for event, elem in ET.iterparse(svg_path, events=('start', 'end')):
+        if event == 'start':
+            if not stack:
+                # Root element carries the SVG dimensions
+                svg_width = float(elem.get('width', 1000))
+                svg_height = float(elem.get('height', 1000))
+                viewbox = elem.get('viewBox', '')
+                if viewbox:
+                    parts = viewbox.split()
+                    if len(parts) >= 4:
+                        svg_width = float(parts[2])
+                        svg_height = float(parts[3])
+            if is_room_space(elem.get('class', '')):
+                open_spaces += 1
+            stack.append(elem)
+            continue
+        
+        stack.pop()
+        is_space = is_room_space(elem.get('class', ''))
+        if is_space:
+            open_spaces -= 1
+            polygon = elem.find('{*}polygon')
+            if polygon is None:
+                polygon = elem.find('.//{*}polygon')
+            if polygon is not None:
+                svg_points = parse_points(polygon.get('points', ''))
+                if len(svg_points):
+                    spaces.append(svg_points)
+        
+        # Keep subtrees of unfinished Spaces until their polygon has been read
+        if is_space or open_spaces == 0:
+            elem.clear()
+            if stack:
+                stack[-1].remove(elem)
+    
+    return svg_width, svg_height, spaces
+
+def _best_offset(edges, walls, offsets, tolerance=10):
+    """
+    Find the offset that aligns the most edges with a wall.
     
-    # Load PNG
-    img = Image.open(png_path)
-    png_array = np.array(img.convert('L'))
-    img_width, img_height = img.size
+    Each candidate offset is evaluated at once: edges are shifted by every
+    offset, the nearest wall on either side is found with a binary search,
+    and edges closer than `tolerance` to a wall count as matches.
+    """
+    edges = np.asarray(edges, dtype=np.int32)
+    walls = np.sort(np.asarray(walls, dtype=np.int32))
+    if edges.size == 0 or walls.size == 0:
+        return 0
+    
+    adjusted = edges[None, :] + offsets[:, None]
+    idx = np.searchsorted(walls, adjusted)
+    left = walls[np.clip(idx - 1, 0, walls.size - 1)]
+    right = walls[np.clip(idx, 0, walls.size - 1)]
+    dist = np.minimum(np.abs(adjusted - left), np.abs(adjusted - right))
+    matches = (dist < tolerance).sum(axis=1)
+    
+    # Keep a zero offset when nothing lines up
+    if matches.max() == 0:
+        return 0
+    return int(offsets[matches.argmax()])
+
+def _search_offset(edges, walls, max_offset=50, coarse_step=10):
+    """
+    Coarse-to-fine offset search.
+    
+    A coarse pass over +/-max_offset finds the neighbourhood of the best
+    alignment, then a 1-pixel pass around it refines the result.
+    """
+    coarse = _best_offset(edges, walls, np.arange(-max_offset, max_offset + 1, coarse_step))
+    half = coarse_step // 2
+    return _best_offset(edges, walls, np.arange(coarse - half, coarse + half + 1))
+
+def extract_space_bboxes(svg_path):
+    """
+    Extract the bounding box of every room Space in an SVG.
+    
+    Returns:
+        Tuple of (bboxes, (svg_width, svg_height)) where bboxes is an
+        (N, 4) array of [x_min, y_min, x_max, y_max] in SVG units
+    """
+    svg_width, svg_height, spaces = read_svg_spaces(svg_path)
+    
+    bboxes = np.empty((len(spaces), 4), dtype=np.float64)
+    for i, svg_points in enumerate(spaces):
+        bboxes[i, :2] = svg_points.min(axis=0)
+        bboxes[i, 2:] = svg_points.max(axis=0)
+    
+    return bboxes, (svg_width, svg_height)
+
+def detect_offset_by_wall_alignment(bboxes, svg_size, png_array):
+    """
+    Detect offset by trying to align SVG room edges with detected walls in PNG.
+    
+    Args:
+        bboxes: (N, 4) array of Space bounding boxes in SVG units
+        svg_size: Tuple of (svg_width, svg_height)
+        png_array: Grayscale PNG as a 2D array
+    """
+    svg_width, svg_height = svg_size
+    img_height, img_width = png_array.shape
     
     scale_x = img_width / svg_width
     scale_y = img_height / svg_height
@@ -65,136 +163,42 @@ def detect_offset_by_wall_alignment(svg_path, png_path):
     # Detect walls in PNG
     h_walls, v_walls = detect_wall_positions(png_array)
     
-    # Extract SVG room edges
-    svg_h_edges = set()
-    svg_v_edges = set()
-    
-    for elem in root.iter():
-        class_attr = elem.get('class', '')
-        if 'Space' in class_attr and not class_attr.startswith('SpaceDimensions'):
-            if any(excluded in class_attr for excluded in ['Window', 'Door', 'Wall', 'FixedFurniture']):
-                continue
-            
-            polygon = None
-            for child in elem.iter():
-                if child.tag.endswith('polygon'):
-                    polygon = child
-                    break
-            
-            if polygon is not None:
-                points_str = polygon.get('points', '')
-                svg_points = parse_points(points_str)
-                
-                if svg_points:
-                    # Get bounding box edges
-                    xs = [p[0] for p in svg_points]
-                    ys = [p[1] for p in svg_points]
-                    
-                    # Transform to PNG scale (not yet offset)
-                    x_min = min(xs) * scale_x
-                    x_max = max(xs) * scale_x
-                    y_min = min(ys) * scale_y
-                    y_max = max(ys) * scale_y
-                    
-                    svg_h_edges.add(int(y_min))
-                    svg_h_edges.add(int(y_max))
-                    svg_v_edges.add(int(x_min))
-                    svg_v_edges.add(int(x_max))
+    # Extract unique SVG room edges, transformed to PNG scale (not yet offset)
+    scaled = (bboxes * [scale_x, scale_y, scale_x, scale_y]).astype(np.int32)
+    svg_v_edges = np.unique(scaled[:, [0, 2]])
+    svg_h_edges = np.unique(scaled[:, [1, 3]])
     
     # Find best offset by matching edges to walls
-    best_offset_x = 0
-    best_offset_y = 0
-    best_matches_x = 0
-    best_matches_y = 0
-    
-    # Try different X offsets
-    for offset_x in range(-50, 51, 5):
-        matches = 0
-        for edge in svg_v_edges:
-            adjusted_edge = edge + offset_x
-            # Check if near any wall
-            for wall in v_walls:
-                if abs(adjusted_edge - wall) < 10:
-                    matches += 1
-                    break
-        if matches > best_matches_x:
-            best_matches_x = matches
-            best_offset_x = offset_x
-    
-    # Try different Y offsets
-    for offset_y in range(-50, 51, 5):
-        matches = 0
-        for edge in svg_h_edges:
-            adjusted_edge = edge + offset_y
-            # Check if near any wall
-            for wall in h_walls:
-                if abs(adjusted_edge - wall) < 10:
-                    matches += 1
-                    break
-        if matches > best_matches_y:
-            best_matches_y = matches
-            best_offset_y = offset_y
+    best_offset_x = _search_offset(svg_v_edges, v_walls)
+    best_offset_y = _search_offset(svg_h_edges, h_walls)
     
     return best_offset_x, best_offset_y, scale_x, scale_y
 
 def label_with_auto_correction(svg_path, png_path, output_path):
     """Label PNG with automatic offset correction."""
+    # Parse SVG once; the boxes feed both offset detection and drawing
+    bboxes, svg_size = extract_space_bboxes(svg_path)
+    
+    # Load PNG
+    img = Image.open(png_path)
+    png_array = np.array(img.convert('L'))
+    
     # Detect offset
     print("Detecting offset...")
-    offset_x, offset_y, scale_x, scale_y = detect_offset_by_wall_alignment(svg_path, png_path)
+    offset_x, offset_y, scale_x, scale_y = detect_offset_by_wall_alignment(bboxes, svg_size, png_array)
     print(f"Detected offset: x={offset_x}, y={offset_y}")
     
-    # Parse SVG
-    tree = ET.parse(svg_path)
-    root = tree.getroot()
+    # Transform with detected offset
+    png_bboxes = (
+        bboxes * [scale_x, scale_y, scale_x, scale_y] + [offset_x, offset_y, offset_x, offset_y]
+    ).astype(np.int32)
     
-    svg_width = float(root.get('width', 1000))
-    svg_height = float(root.get('height', 1000))
-    viewbox = root.get('viewBox', '')
-    if viewbox:
-        parts = viewbox.split()
-        if len(parts) >= 4:
-            svg_width = float(parts[2])
-            svg_height = float(parts[3])
-    
-    # Load PNG
-    img = Image.open(png_path)
     draw = ImageDraw.Draw(img)
+    for bbox in png_bboxes.tolist():
+        # Draw bounding box
+        draw.rectangle(bbox, outline="red", width=3)
     
-    room_count = 0
-    
-    for elem in root.iter():
-        class_attr = elem.get('class', '')
-        if 'Space' in class_attr and not class_attr.startswith('SpaceDimensions'):
-            if any(excluded in class_attr for excluded in ['Window', 'Door', 'Wall', 'FixedFurniture']):
-                continue
-            
-            polygon = None
-            for child in elem.iter():
-                if child.tag.endswith('polygon'):
-                    polygon = child
-                    break
-            
-            if polygon is not None:
-                points_str = polygon.get('points', '')
-                svg_points = parse_points(points_str)
-                
-                if svg_points:
-                    # Transform with detected offset
-                    png_points = [
-                        (int((p[0] * scale_x) + offset_x), 
-                         int((p[1] * scale_y) + offset_y)) 
-                        for p in svg_points
-                    ]
-                    
-                    # Calculate bbox
-                    xs = [p[0] for p in png_points]
-                    ys = [p[1] for p in png_points]
-                    bbox = [min(xs), min(ys), max(xs), max(ys)]
-                    
-                    # Draw bounding box
-                    draw.rectangle(bbox, outline="red", width=3)
-                    room_count += 1
+    room_count = len(png_bboxes)
     
     img.save(output_path)
     print(f"Labeled {room_count} rooms with offset correction")
@@ -11,14 +11,15 @@ import subprocess
 
 # Add current directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent))
-from auto_offset_correction import detect_offset_by_wall_alignment
+from auto_offset_correction import detect_offset_by_wall_alignment, extract_space_bboxes
 
 try:
     from PIL import Image, ImageDraw
+    import numpy as np
     HAS_PIL = True
 except ImportError:
     HAS_PIL = False
-    print("Warning: PIL not installed. Install with: pip install Pillow")
+    print("Warning: PIL not installed. Install with: pip install Pillow numpy")
     sys.exit(1)
 
 def extract_rooms_from_svg(svg_path):
@@ -67,7 +68,9 @@ def draw_accurate_bounding_boxes(image_path, rooms_data, output_path, svg_width,
         # Detect and apply offset correction
         print(f"    Detecting offset...", end=" ")
         try:
-            offset_x, offset_y, _, _ = detect_offset_by_wall_alignment(str(svg_path), image_path)
+            bboxes, svg_size = extract_space_bboxes(str(svg_path))
+            png_array = np.array(img.convert('L'))
+            offset_x, offset_y, _, _ = detect_offset_by_wall_alignment(bboxes, svg_size, png_array)
             print(f"offset: x={offset_x}, y={offset_y}")
         except Exception as e:
             print(f"using default (0, 0) - {e}")